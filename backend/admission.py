@@ -0,0 +1,218 @@
+"""
+Admission control and load shedding for submit endpoints.
+
+Submit routes get a per-route concurrency limit and a per-client token
+bucket. Read endpoints that drive the booth displays are never limited
+here; instead, submits are shed once total in-flight requests pass
+ADMISSION_SHED_WRITES_ABOVE so displays keep headroom at peak.
+
+Rejections are immediate: 429 when a client exceeds its rate, 503 when
+a route or the server is saturated, both with Retry-After.
+
+Clients are keyed by peer address. X-Forwarded-For is only honoured when
+the peer is one of ADMISSION_TRUSTED_PROXIES, and then the client is the
+rightmost hop that is not a trusted proxy, since anything left of that
+was written by the client itself. Kiosks may instead identify themselves
+with a header named by ADMISSION_CLIENT_ID_HEADER (off by default; any
+caller can set it).
+"""
+
+import ipaddress
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_SUBMIT_CONCURRENCY = int(os.getenv("ADMISSION_SUBMIT_CONCURRENCY", "16"))
+# Sized for a booth's kiosks sharing one NAT address
+ADMISSION_RATE_PER_CLIENT = float(os.getenv("ADMISSION_RATE_PER_CLIENT", "5"))  # tokens per second
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "30"))
+ADMISSION_SHED_WRITES_ABOVE = int(os.getenv("ADMISSION_SHED_WRITES_ABOVE", "64"))
+# Comma-separated proxy IPs/CIDRs whose X-Forwarded-For is believed
+ADMISSION_TRUSTED_PROXIES = os.getenv("ADMISSION_TRUSTED_PROXIES", "127.0.0.1,::1")
+# e.g. "X-Client-Id" to let kiosks behind one NAT identify themselves; empty disables it
+ADMISSION_CLIENT_ID_HEADER = os.getenv("ADMISSION_CLIENT_ID_HEADER", "")
+
+
+def parse_networks(value: str) -> list:
+    """Networks from a comma-separated list of IPs and CIDRs"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+@dataclass
+class RouteLimit:
+    concurrency: int = ADMISSION_SUBMIT_CONCURRENCY
+    rate: float = ADMISSION_RATE_PER_CLIENT
+    burst: float = ADMISSION_BURST
+
+
+# (method, path) -> limits; anything not listed is admitted unconditionally
+SUBMIT_ROUTES = {
+    ("POST", "/api/ratings"): RouteLimit(),
+    ("POST", "/api/ratings/upload"): RouteLimit(),
+    ("POST", "/api/quiz/submit"): RouteLimit(),
+    ("POST", "/api/quiz-arena/submit"): RouteLimit(),
+}
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, rate: float, burst: float) -> float:
+        """Consume a token; returns 0 on success or seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate if rate > 0 else 60.0
+
+
+class AdmissionController:
+    """Tracks in-flight requests and per-client buckets; used by AdmissionMiddleware"""
+
+    def __init__(self, routes: Dict[Tuple[str, str], RouteLimit] = None,
+                 shed_writes_above: int = ADMISSION_SHED_WRITES_ABOVE, enabled: bool = ADMISSION_ENABLED,
+                 max_buckets: int = 10000):
+        self.routes = SUBMIT_ROUTES if routes is None else routes
+        self.shed_writes_above = shed_writes_above
+        self.enabled = enabled
+        self.max_buckets = max_buckets
+        self.inflight = 0
+        self._route_inflight: Dict[Tuple[str, str], int] = {}
+        self._buckets: Dict[Tuple[Tuple[str, str], str], TokenBucket] = {}
+        self._stats = {"admitted": 0, "shed_rate": 0, "shed_concurrency": 0, "shed_overload": 0}
+        self._shed_by_route: Dict[str, int] = {}
+
+    def check(self, route: Tuple[str, str], client: str) -> Optional[Tuple[int, float, str]]:
+        """Return None to admit, or (status, retry_after, reason) to shed"""
+        limit = self.routes.get(route)
+        if limit is None:
+            return None
+        if self.inflight >= self.shed_writes_above:
+            return self._shed(route, "shed_overload", 503, 1.0, "Server is busy, try again shortly")
+        if self._route_inflight.get(route, 0) >= limit.concurrency:
+            return self._shed(route, "shed_concurrency", 503, 1.0, "Too many submissions in progress")
+
+        bucket = self._buckets.get((route, client))
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(limit)
+            bucket = self._buckets[(route, client)] = TokenBucket(limit.burst)
+        wait = bucket.take(limit.rate, limit.burst)
+        if wait > 0:
+            return self._shed(route, "shed_rate", 429, wait, "Too many submissions from this client")
+        return None
+
+    def _shed(self, route, counter: str, status: int, retry_after: float, reason: str):
+        self._stats[counter] += 1
+        key = f"{route[0]} {route[1]}"
+        self._shed_by_route[key] = self._shed_by_route.get(key, 0) + 1
+        return status, retry_after, reason
+
+    def _prune(self, limit: RouteLimit):
+        # Buckets that have refilled completely carry no state worth keeping
+        now = time.monotonic()
+        idle = [key for key, b in self._buckets.items() if b.tokens + (now - b.updated) * limit.rate >= limit.burst]
+        for key in idle:
+            del self._buckets[key]
+
+    def enter(self, route):
+        self.inflight += 1
+        self._stats["admitted"] += 1
+        if route in self.routes:
+            self._route_inflight[route] = self._route_inflight.get(route, 0) + 1
+
+    def leave(self, route):
+        self.inflight -= 1
+        if route in self.routes:
+            self._route_inflight[route] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "inflight": self.inflight,
+            "route_inflight": {f"{m} {p}": n for (m, p), n in self._route_inflight.items()},
+            **self._stats,
+            "shed_by_route": dict(self._shed_by_route),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests"""
+
+    def __init__(self, app, controller: AdmissionController, trusted_proxies: str = ADMISSION_TRUSTED_PROXIES,
+                 client_id_header: str = ADMISSION_CLIENT_ID_HEADER):
+        self.app = app
+        self.controller = controller
+        self.trusted_proxies = parse_networks(trusted_proxies)
+        self.client_id_header = client_id_header.lower().encode() if client_id_header else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route = (scope["method"], scope["path"].rstrip("/") or "/")
+        rejection = self.controller.check(route, self._client_key(scope))
+        if rejection is not None:
+            status, retry_after, reason = rejection
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": orjson.dumps({"detail": reason})})
+            return
+
+        self.controller.enter(route)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.leave(route)
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _client_key(self, scope) -> str:
+        headers = scope.get("headers", [])
+        if self.client_id_header:
+            for name, value in headers:
+                if name == self.client_id_header:
+                    return "id:" + value.decode("latin-1")[:64]
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        if not self._trusted(address):
+            return address
+        hops = [
+            hop.strip()
+            for name, value in headers if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",")
+        ]
+        # Walk back from the proxy that connected to us to the first hop it did not add itself
+        for hop in reversed(hops):
+            if not hop:
+                continue
+            address = hop
+            if not self._trusted(hop):
+                break
+        return address[:64]
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,111 @@
+"""
+Benchmark CPU time to serialize list endpoint responses.
+
+Compares the previous path (raw Mongo documents -> one pydantic model per
+row -> response_model validation -> jsonable_encoder -> json.dumps) with
+the current one (documents already shaped by the $project stage ->
+orjson.dumps). Mongo itself is not involved; documents are synthetic.
+
+Usage: python bench_serialization.py [--rows 10000] [--photo-bytes 0]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+
+class RatingResponse(BaseModel):
+    id: str
+    stars: int
+    comment: str
+    photo: str
+    company: str
+    timestamp: str
+
+
+def make_raw_docs(rows: int, photo_bytes: int) -> list:
+    start = datetime(2025, 12, 1)
+    photo = "A" * photo_bytes
+    return [
+        {
+            "_id": ObjectId(),
+            "stars": random.randint(1, 5),
+            "comment": "Great booth, very helpful staff" if i % 3 else "",
+            "photo": photo,
+            "company": f"Company {i % 50}",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(rows)
+    ]
+
+
+def project(raw_docs: list) -> list:
+    """What the $project stage returns for the same documents"""
+    return [
+        {
+            "id": str(doc["_id"]),
+            "stars": doc["stars"],
+            "comment": doc.get("comment", ""),
+            "photo": doc.get("photo", ""),
+            "company": doc.get("company", ""),
+            "timestamp": doc["timestamp"],
+        }
+        for doc in raw_docs
+    ]
+
+
+def before(raw_docs: list) -> bytes:
+    models = [
+        RatingResponse(
+            id=str(doc["_id"]),
+            stars=doc["stars"],
+            comment=doc.get("comment", ""),
+            photo=doc.get("photo", ""),
+            company=doc.get("company", ""),
+            timestamp=doc["timestamp"],
+        )
+        for doc in raw_docs
+    ]
+    validated = TypeAdapter(List[RatingResponse]).validate_python(models, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def after(projected_docs: list) -> bytes:
+    return orjson.dumps(projected_docs)
+
+
+def cpu_ms(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(arg)
+        best = min(best, time.process_time() - started)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--photo-bytes", type=int, default=0, help="Size of the inline photo string per row")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = make_raw_docs(args.rows, args.photo_bytes)
+    projected = project(raw)
+    assert orjson.loads(before(raw)) == orjson.loads(after(projected))
+
+    before_ms = cpu_ms(before, raw, args.repeat)
+    after_ms = cpu_ms(after, projected, args.repeat)
+    per_10k = 10000 / args.rows
+    print(f"rows={args.rows} photo_bytes={args.photo_bytes}")
+    print(f"before: {before_ms * per_10k:8.1f} ms CPU per 10k rows")
+    print(f"after:  {after_ms * per_10k:8.1f} ms CPU per 10k rows")
+    print(f"speedup: {before_ms / after_ms:.1f}x")
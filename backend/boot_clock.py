@@ -0,0 +1,10 @@
+"""
+Start of the cold-start measurement.
+
+server.py imports this module before anything else, so STARTED also
+covers loading FastAPI, pymongo and the app's own modules.
+"""
+
+import time
+
+STARTED = time.perf_counter()
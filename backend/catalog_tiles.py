@@ -0,0 +1,193 @@
+"""
+Deep-zoom (DZI-style) tile pyramids for catalog pages.
+
+Each catalog image gets a pyramid of fixed-size JPEG tiles, cached on disk
+under TILES_CACHE_DIR/<image file name>/ together with a manifest.json that
+records the SHA-256 of the source file. A changed source hash invalidates
+the cached pyramid.
+
+Workers sharing TILES_CACHE_DIR take an flock per image before checking
+the on-disk manifest, so only the first one generates a pyramid and the
+others find it complete.
+
+Level 0 is a 1x1 pixel image and the highest level is the full-resolution
+page, following the Deep Zoom convention. Run `python catalog_tiles.py`
+to pre-generate tiles for every catalog image.
+"""
+
+import fcntl
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TILES_CACHE_DIR = os.getenv("TILES_CACHE_DIR", os.path.join(BASE_DIR, "cache", "tiles"))
+TILE_SIZE = int(os.getenv("TILE_SIZE", "256"))
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "1"))
+TILE_FORMAT = "jpg"
+TILE_JPEG_QUALITY = int(os.getenv("TILE_JPEG_QUALITY", "85"))
+
+# Manifests of generated pyramids keyed by source path, with the
+# (mtime, size) they were validated against so we only re-hash on change
+_manifests = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tiles_dir(source_path: str) -> str:
+    # Keep the extension: 001.png and 001.jpg are different catalog pages
+    return os.path.join(TILES_CACHE_DIR, os.path.basename(source_path))
+
+
+def _read_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _generate(source_path: str, source_hash: str, tile_size: int, overlap: int) -> dict:
+    """Write a complete pyramid to a temp dir and swap it into place"""
+    target = tiles_dir(source_path)
+    os.makedirs(TILES_CACHE_DIR, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=TILES_CACHE_DIR, prefix=".tmp-")
+    try:
+        with Image.open(source_path) as img:
+            img = img.convert("RGB")
+            width, height = img.size
+            max_level = math.ceil(math.log2(max(width, height, 1)))
+
+            # Walk down from full resolution, halving the previous level each time
+            level_img = img
+            for level in range(max_level, -1, -1):
+                scale = 2 ** (max_level - level)
+                level_size = (max(1, math.ceil(width / scale)), max(1, math.ceil(height / scale)))
+                if level_img.size != level_size:
+                    level_img = level_img.resize(level_size, Image.LANCZOS)
+
+                level_dir = os.path.join(work_dir, str(level))
+                os.makedirs(level_dir)
+                cols = math.ceil(level_size[0] / tile_size)
+                rows = math.ceil(level_size[1] / tile_size)
+                for x in range(cols):
+                    for y in range(rows):
+                        box = (
+                            max(0, x * tile_size - overlap),
+                            max(0, y * tile_size - overlap),
+                            min(level_size[0], (x + 1) * tile_size + overlap),
+                            min(level_size[1], (y + 1) * tile_size + overlap),
+                        )
+                        level_img.crop(box).save(
+                            os.path.join(level_dir, f"{x}_{y}.{TILE_FORMAT}"),
+                            "JPEG", quality=TILE_JPEG_QUALITY, optimize=True
+                        )
+
+        manifest = {
+            "source": os.path.basename(source_path),
+            "sha256": source_hash,
+            "width": width,
+            "height": height,
+            "tile_size": tile_size,
+            "overlap": overlap,
+            "format": TILE_FORMAT,
+            "max_level": max_level,
+        }
+        with open(os.path.join(work_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        # Move the old pyramid aside rather than deleting it first, so tiles are missing
+        # only between two renames instead of for the whole delete
+        old_dir = None
+        if os.path.exists(target):
+            old_dir = f"{work_dir}.old"
+            os.rename(target, old_dir)
+        os.replace(work_dir, target)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        return manifest
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+
+@contextmanager
+def _generation_lock(source_path: str):
+    """Exclusive per image across threads and across workers sharing TILES_CACHE_DIR"""
+    with _locks_guard:
+        lock = _locks.setdefault(source_path, threading.Lock())
+    with lock:
+        os.makedirs(TILES_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(TILES_CACHE_DIR, f".{os.path.basename(source_path)}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_tiles(source_path: str, force: bool = False) -> dict:
+    """Return the pyramid manifest for a catalog image, (re)generating it if stale"""
+    stat = os.stat(source_path)
+    fingerprint = (stat.st_mtime, stat.st_size)
+    cached = _manifests.get(source_path)
+    if cached and cached[0] == fingerprint and not force:
+        return cached[1]
+
+    with _generation_lock(source_path):
+        # Another thread may have finished generating while we waited
+        cached = _manifests.get(source_path)
+        if cached and cached[0] == fingerprint and not force:
+            return cached[1]
+
+        # Read under the lock: another worker may have just generated it
+        source_hash = file_sha256(source_path)
+        manifest = _read_manifest(tiles_dir(source_path))
+        if (force or manifest is None or manifest.get("sha256") != source_hash
+                or manifest.get("tile_size") != TILE_SIZE or manifest.get("overlap") != TILE_OVERLAP):
+            manifest = _generate(source_path, source_hash, TILE_SIZE, TILE_OVERLAP)
+        _manifests[source_path] = (fingerprint, manifest)
+        return manifest
+
+
+def tile_path(source_path: str, level: int, x: int, y: int) -> str:
+    return os.path.join(tiles_dir(source_path), str(level), f"{x}_{y}.{TILE_FORMAT}")
+
+
+def generate_all(paths: list, force: bool = False) -> list:
+    """Pre-generate pyramids for every path, returning their manifests"""
+    return [ensure_tiles(path, force=force) for path in paths]
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    parser = argparse.ArgumentParser(description="Pre-generate deep-zoom tiles for catalog images")
+    parser.add_argument("--catalog-dir", default=os.path.join(BASE_DIR, "static", "catalog"))
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the cache is up to date")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.catalog_dir, "*.png")) + glob.glob(os.path.join(args.catalog_dir, "*.jpg")))
+    for path in paths:
+        started = time.perf_counter()
+        manifest = ensure_tiles(path, force=args.force)
+        print(f"{os.path.basename(path)}: {manifest['width']}x{manifest['height']}, "
+              f"{manifest['max_level'] + 1} levels ({time.perf_counter() - started:.2f}s)")
@@ -0,0 +1,172 @@
+"""
+Cross-worker invalidation via MongoDB change streams.
+
+Each worker runs one background thread per watched collection. Changes are
+published to in-process subscribers (e.g. the response cache) so state
+held by this worker is invalidated when another worker handles a write.
+
+Resume tokens are persisted to CHANGE_TOKEN_DIR so a restarted worker
+continues where it stopped. Change streams need a replica set; against a
+standalone mongod the watcher falls back to polling a cheap collection
+fingerprint and publishes an "invalidate" event when it changes.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+from bson import json_util
+from pymongo.errors import OperationFailure, PyMongoError
+
+CHANGE_WATCHER_ENABLED = os.getenv("CHANGE_WATCHER_ENABLED", "1") == "1"
+CHANGE_TOKEN_DIR = os.getenv(
+    "CHANGE_TOKEN_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "change_tokens")
+)
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "2"))
+CHANGE_RETRY_DELAY = float(os.getenv("CHANGE_RETRY_DELAY", "5"))
+
+# Server error codes that decide how the watcher recovers
+CHANGE_STREAM_NOT_SUPPORTED = 40573  # standalone mongod
+CHANGE_STREAM_HISTORY_LOST = 286  # resume token fell off the oplog
+INVALID_RESUME_TOKEN = 260
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeWatcher:
+    """Watches collections and publishes change events to subscribers"""
+
+    def __init__(self, collections: list, token_dir: str = CHANGE_TOKEN_DIR,
+                 poll_interval: float = CHANGE_POLL_INTERVAL, retry_delay: float = CHANGE_RETRY_DELAY,
+                 max_await_ms: int = 1000):
+        self.collections = collections
+        self.token_dir = token_dir
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_await_ms = max_await_ms
+        self.modes = {}  # collection name -> "change_stream" | "polling"
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stats = {"events": 0, "errors": 0, "history_lost": 0}
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """Register `callback(event)`; it is called from the watcher threads"""
+        self._subscribers.append(callback)
+
+    def publish(self, event: dict):
+        self._stats["events"] += 1
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Change subscriber failed for %s", event)
+
+    def start(self):
+        self._stop.clear()
+        for collection in self.collections:
+            thread = threading.Thread(
+                target=self._run, args=(collection,), name=f"change-watcher-{collection.name}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> dict:
+        return {"modes": dict(self.modes), **self._stats}
+
+    # Resume tokens
+
+    def _token_path(self, name: str) -> str:
+        return os.path.join(self.token_dir, f"{name}.json")
+
+    def load_token(self, name: str) -> Optional[dict]:
+        try:
+            with open(self._token_path(name)) as f:
+                return json_util.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def save_token(self, name: str, token: Optional[dict]):
+        path = self._token_path(name)
+        if token is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(self.token_dir, exist_ok=True)
+        # Every worker watches the same collections and saves the same token files
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json_util.dumps(token))
+        os.replace(tmp_path, path)
+
+    # Watch loops
+
+    def _run(self, collection):
+        name = collection.name
+        while not self._stop.is_set():
+            try:
+                self._watch(collection)
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                    self._poll(collection)
+                    return
+                if e.code in (CHANGE_STREAM_HISTORY_LOST, INVALID_RESUME_TOKEN):
+                    # Missed changes cannot be replayed, so subscribers must drop everything
+                    self._stats["history_lost"] += 1
+                    self.save_token(name, None)
+                    self.publish({"collection": name, "operation": "invalidate", "document_id": None})
+                    continue
+                self._stats["errors"] += 1
+                logger.warning("Change stream on %s failed: %s", name, e)
+                self._stop.wait(self.retry_delay)
+            except PyMongoError as e:
+                self._stats["errors"] += 1
+                logger.warning("Change stream on %s failed: %s", name, e)
+                self._stop.wait(self.retry_delay)
+
+    def _watch(self, collection):
+        name = collection.name
+        token = self.load_token(name)
+        with collection.watch(resume_after=token, max_await_time_ms=self.max_await_ms) as stream:
+            self.modes[name] = "change_stream"
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    document_key = change.get("documentKey") or {}
+                    self.publish({
+                        "collection": name,
+                        "operation": change["operationType"],
+                        "document_id": str(document_key["_id"]) if "_id" in document_key else None,
+                    })
+                # The token also advances on empty batches, keeping it inside the oplog window
+                if stream.resume_token is not None and stream.resume_token != token:
+                    token = stream.resume_token
+                    self.save_token(name, token)
+
+    def _poll(self, collection):
+        name = collection.name
+        self.modes[name] = "polling"
+        last = None
+        while not self._stop.is_set():
+            try:
+                fingerprint = self.fingerprint(collection)
+                if last is not None and fingerprint != last:
+                    self.publish({"collection": name, "operation": "invalidate", "document_id": None})
+                last = fingerprint
+            except PyMongoError as e:
+                self._stats["errors"] += 1
+                logger.warning("Polling %s failed: %s", name, e)
+            self._stop.wait(self.poll_interval)
+
+    @staticmethod
+    def fingerprint(collection) -> tuple:
+        """Document count plus newest _id; changes on any insert or delete"""
+        newest = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return collection.estimated_document_count(), newest["_id"] if newest else None
@@ -0,0 +1,207 @@
+"""
+Image processing for uploaded rating photos.
+
+Decoding and re-encoding photos is CPU-bound, so it runs in a bounded
+ProcessPoolExecutor instead of on the asyncio loop that serves the API.
+
+Run `python image_processing.py <image> [...]` to benchmark throughput
+across worker counts.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool  # noqa: F401 (re-exported for callers)
+from typing import Optional
+
+from PIL import Image, ImageOps
+from PIL.Image import DecompressionBombError  # noqa: F401 (re-exported for callers)
+
+# Processing settings (override via environment)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+IMAGE_QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", "32"))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "20"))
+PHOTO_MAX_DIMENSION = int(os.getenv("PHOTO_MAX_DIMENSION", "1600"))
+PHOTO_JPEG_QUALITY = int(os.getenv("PHOTO_JPEG_QUALITY", "85"))
+
+
+class ImageProcessingBusy(Exception):
+    """Raised when the processing queue is full"""
+
+
+def normalize_photo(src_path: str, dest_path: str, max_dimension: int, quality: int) -> dict:
+    """Rotate by EXIF, cap the resolution and re-encode as progressive JPEG without metadata.
+
+    Runs inside a worker process; returns timing info for the parent's metrics.
+    """
+    started = time.time()
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            # Flatten transparency onto white so PNG/WebP uploads encode cleanly
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img.convert("RGBA"), mask=img.convert("RGBA").split()[-1])
+            img = background
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        # Saving a fresh image drops EXIF (including GPS) and other metadata
+        img.save(dest_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        width, height = img.size
+    return {
+        "started": started,
+        "processing_time": time.time() - started,
+        "width": width,
+        "height": height,
+        "bytes": os.path.getsize(dest_path),
+    }
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ImageProcessor:
+    """Bounded process pool with queue limit, timeout and metrics"""
+
+    def __init__(self, workers: int = IMAGE_WORKERS, queue_limit: int = IMAGE_QUEUE_LIMIT,
+                 timeout: float = IMAGE_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Jobs submitted and not yet finished, including ones whose caller timed out
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._stats = {"processed": 0, "failed": 0, "timed_out": 0, "rejected": 0, "pool_restarts": 0}
+        # Recent samples (seconds) for averages and percentiles
+        self._queue_wait = deque(maxlen=1000)
+        self._processing_time = deque(maxlen=1000)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drop a pool whose worker died (OOM, killed); the next job starts a new one"""
+        with self._pending_lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._stats["pool_restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _job_done(self, job):
+        # Called from the pool's management thread once the job finishes or is cancelled
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def normalize(self, src_path: str, dest_path: str,
+                        max_dimension: int = PHOTO_MAX_DIMENSION, quality: int = PHOTO_JPEG_QUALITY) -> dict:
+        """Normalize a photo in the pool; raises ImageProcessingBusy, BrokenProcessPool or asyncio.TimeoutError"""
+        with self._pending_lock:
+            if self._pending >= self.queue_limit:
+                self._stats["rejected"] += 1
+                raise ImageProcessingBusy(f"Image queue is full ({self.queue_limit} pending)")
+            self._pending += 1
+
+        submitted = time.time()
+        executor = self._get_executor()
+        try:
+            job = executor.submit(normalize_photo, src_path, dest_path, max_dimension, quality)
+        except BaseException as e:
+            with self._pending_lock:
+                self._pending -= 1
+            if isinstance(e, BrokenProcessPool):
+                self._stats["failed"] += 1
+                self._discard_executor(executor)
+            raise
+        job.add_done_callback(self._job_done)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timed_out"] += 1
+            # A running job cannot be interrupted; discard its output whenever it finishes
+            job.add_done_callback(lambda _: _remove_file(dest_path))
+            raise
+        except BrokenProcessPool:
+            self._stats["failed"] += 1
+            self._discard_executor(executor)
+            raise
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+
+        self._stats["processed"] += 1
+        self._queue_wait.append(max(0.0, result["started"] - submitted))
+        self._processing_time.append(result["processing_time"])
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        def summarize(samples) -> dict:
+            if not samples:
+                return {"avg_ms": 0, "p95_ms": 0, "max_ms": 0}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self._pending,
+            **self._stats,
+            "queue_wait": summarize(self._queue_wait),
+            "processing_time": summarize(self._processing_time),
+        }
+
+
+async def _benchmark(paths: list, workers: int, repeat: int) -> float:
+    """Process every path `repeat` times and return images per second"""
+    import tempfile
+
+    processor = ImageProcessor(workers=workers, queue_limit=len(paths) * repeat, timeout=120)
+    with tempfile.TemporaryDirectory() as out_dir:
+        jobs = [
+            processor.normalize(path, os.path.join(out_dir, f"{i}_{n}.jpg"))
+            for n in range(repeat)
+            for i, path in enumerate(paths)
+        ]
+        # Warm up the pool so process start-up is not measured
+        await processor.normalize(paths[0], os.path.join(out_dir, "warmup.jpg"))
+        started = time.perf_counter()
+        await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - started
+    processor.shutdown()
+    return len(jobs) / elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark photo normalization throughput across cores")
+    parser.add_argument("images", nargs="+", help="Sample images to process")
+    parser.add_argument("--repeat", type=int, default=5, help="Times each image is processed per run")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'images/s':>10} {'speedup':>8}")
+    workers = 1
+    while workers <= args.max_workers:
+        throughput = asyncio.run(_benchmark(args.images, workers, args.repeat))
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+        workers *= 2
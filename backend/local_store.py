@@ -0,0 +1,620 @@
+"""
+Embedded SQLite storage for offline, single-node events.
+
+LocalClient / LocalCollection implement the subset of the pymongo API that
+server.py uses (insert, find with sort/limit, counts, deletes, aggregate,
+create_index), so the endpoints run unchanged with STORAGE_BACKEND=sqlite.
+
+Each collection is a table of (id, doc) where `doc` is the document as
+Extended JSON. Filters, sorts and simple groupings are translated to SQL
+over json_extract() expressions, and create_index() builds expression
+indexes on the same expressions so SQLite can use them. Remaining
+aggregation stages are evaluated in Python.
+
+The database runs in WAL mode so readers never block the writer.
+
+Run `python local_store.py sync` after the event to bulk-upload the local
+data into MongoDB; document IDs are preserved, so re-running is safe.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+from bson import ObjectId, json_util
+from pymongo.errors import OperationFailure
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "inovix.db"))
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+_COMPARISON_OPS = {"$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">=", "$ne": "IS NOT"}
+_SQL_ACCUMULATORS = {"$avg": "AVG", "$max": "MAX", "$min": "MIN", "$sum": "SUM"}
+
+# Raised by watch() so ChangeWatcher falls back to polling, as with a standalone mongod
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+def _column(field: str) -> str:
+    """SQL expression for a document field; identical text everywhere so indexes match"""
+    if field == "_id":
+        return "id"
+    if not _FIELD_RE.match(field):
+        raise OperationFailure(f"Unsupported field name: {field}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _sql_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _where(filter: Optional[dict]) -> tuple:
+    """Translate a Mongo filter into (sql, params)"""
+    clauses, params = [], []
+    for field, condition in (filter or {}).items():
+        if field in ("$and", "$or"):
+            parts = [_where(sub) for sub in condition]
+            joiner = " AND " if field == "$and" else " OR "
+            clauses.append("(" + joiner.join(f"({sql})" for sql, _ in parts) + ")")
+            for _, sub_params in parts:
+                params.extend(sub_params)
+            continue
+
+        column = _column(field)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, value in condition.items():
+                if op in _COMPARISON_OPS:
+                    clauses.append(f"{column} {_COMPARISON_OPS[op]} ?")
+                    params.append(_sql_value(value))
+                elif op in ("$in", "$nin"):
+                    values = [_sql_value(v) for v in value]
+                    if not values:
+                        clauses.append("0" if op == "$in" else "1")
+                        continue
+                    negate = "NOT " if op == "$nin" else ""
+                    clauses.append(f"{column} {negate}IN ({','.join('?' * len(values))})")
+                    params.extend(values)
+                elif op == "$regex":
+                    flags = condition.get("$options", "")
+                    clauses.append(f"regexp(?, {column}, ?)")
+                    params.extend([value, flags])
+                elif op == "$options":
+                    continue
+                elif op == "$exists":
+                    clauses.append(f"{column} IS {'NOT ' if value else ''}NULL")
+                else:
+                    raise OperationFailure(f"Unsupported query operator: {op}")
+        elif condition is None:
+            clauses.append(f"{column} IS NULL")
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(_sql_value(condition))
+    return (" AND ".join(clauses) or "1"), params
+
+
+def _order_by(sort) -> str:
+    if not sort:
+        return ""
+    if isinstance(sort, dict):
+        sort = list(sort.items())
+    return " ORDER BY " + ", ".join(f"{_column(f)} {'DESC' if d == -1 else 'ASC'}" for f, d in sort)
+
+
+def _regexp(pattern, value, flags) -> bool:
+    if value is None:
+        return False
+    return re.search(pattern, str(value), re.IGNORECASE if "i" in (flags or "") else 0) is not None
+
+
+def _get_path(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _evaluate(expr, doc: dict):
+    """Evaluate the aggregation expressions used by the API"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get_path(doc, expr[1:])
+    if isinstance(expr, dict) and not any(key.startswith("$") for key in expr):
+        # Object expression such as a compound $group key
+        return {key: _evaluate(value, doc) for key, value in expr.items()}
+    if isinstance(expr, dict) and len(expr) == 1:
+        op, arg = next(iter(expr.items()))
+        if op == "$toString":
+            value = _evaluate(arg, doc)
+            return None if value is None else str(value)
+        if op == "$cond":
+            condition, then, otherwise = arg
+            return _evaluate(then if _evaluate(condition, doc) else otherwise, doc)
+        if op == "$eq":
+            return _evaluate(arg[0], doc) == _evaluate(arg[1], doc)
+        if op == "$ifNull":
+            for candidate in arg:
+                value = _evaluate(candidate, doc)
+                if value is not None:
+                    return value
+            return None
+        args = [_evaluate(a, doc) for a in (arg if isinstance(arg, list) else [arg])]
+        if any(a is None for a in args):
+            return None
+        if op == "$round":
+            return round(args[0], args[1] if len(args) > 1 else 0)
+        if op == "$divide":
+            return args[0] / args[1]
+        if op == "$multiply":
+            result = 1
+            for a in args:
+                result *= a
+            return result
+        if op == "$add":
+            return sum(args)
+        if op == "$subtract":
+            return args[0] - args[1]
+        if op == "$toLower":
+            return str(args[0]).lower()
+        raise OperationFailure(f"Unsupported expression operator: {op}")
+    return expr
+
+
+def _project(doc: dict, spec: dict) -> dict:
+    exclusions = [k for k, v in spec.items() if v in (0, False)]
+    if exclusions and len(exclusions) == len(spec):
+        return {k: v for k, v in doc.items() if k not in exclusions}
+    result = {}
+    if "_id" not in spec:
+        result["_id"] = doc.get("_id")
+    for key, value in spec.items():
+        if value in (0, False):
+            continue
+        if value in (1, True):
+            if key in doc:
+                result[key] = doc[key]
+        else:
+            result[key] = _evaluate(value, doc)
+    return result
+
+
+def _group(docs: Iterable[dict], spec: dict) -> List[dict]:
+    groups = {}
+    for doc in docs:
+        key = _evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        if hashable not in groups:
+            groups[hashable] = {"_id": key, "_acc": {}}
+        acc = groups[hashable]["_acc"]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, arg = next(iter(accumulator.items()))
+            value = _evaluate(arg, doc)
+            state = acc.setdefault(field, {"sum": 0, "count": 0, "value": None, "items": []})
+            if op in ("$sum", "$avg") and isinstance(value, (int, float)):
+                state["sum"] += value
+                state["count"] += 1
+            elif op == "$max" and value is not None:
+                state["value"] = value if state["value"] is None else max(state["value"], value)
+            elif op == "$min" and value is not None:
+                state["value"] = value if state["value"] is None else min(state["value"], value)
+            elif op == "$push":
+                state["items"].append(value)
+    results = []
+    for group in groups.values():
+        row = {"_id": group["_id"]}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op = next(iter(accumulator))
+            state = group["_acc"].get(field, {"sum": 0, "count": 0, "value": None, "items": []})
+            if op == "$sum":
+                row[field] = state["sum"]
+            elif op == "$avg":
+                row[field] = state["sum"] / state["count"] if state["count"] else None
+            elif op == "$push":
+                row[field] = state["items"]
+            else:
+                row[field] = state["value"]
+        results.append(row)
+    return results
+
+
+def _sort_docs(docs: List[dict], sort: dict) -> List[dict]:
+    # Stable sorts applied from the least significant key; None sorts first like Mongo
+    for field, direction in reversed(list(sort.items())):
+        docs.sort(key=lambda d: (_get_path(d, field) is not None, _get_path(d, field)), reverse=direction == -1)
+    return docs
+
+
+class LocalCursor:
+    """Lazy find() result supporting sort/limit/skip chaining"""
+
+    def __init__(self, collection, filter, projection):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int):
+        self._skip = skip
+        return self
+
+    def __iter__(self):
+        docs = self._collection._select(self._filter, self._sort, self._limit, self._skip)
+        if self._projection:
+            return (_project(doc, self._projection) for doc in docs)
+        return iter(docs)
+
+
+class LocalCollection:
+    def __init__(self, database, name: str):
+        if not _FIELD_RE.match(name):
+            raise ValueError(f"Invalid collection name: {name}")
+        self.database = database
+        self.name = name
+        self._conn().execute(f"CREATE TABLE IF NOT EXISTS {name} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        return self.database.client.connection()
+
+    @contextmanager
+    def _transaction(self):
+        """Explicit write transaction; the connections autocommit, so `with conn:` would not open one"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def with_options(self, **kwargs):
+        # Read preferences and write concerns have no meaning for a single local file
+        return self
+
+    # Reads
+
+    def _select(self, filter=None, sort=None, limit=0, skip=0) -> List[dict]:
+        where, params = _where(filter)
+        sql = f"SELECT id, doc FROM {self.name} WHERE {where}{_order_by(sort)}"
+        if limit or skip:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit or -1, skip]
+        return [self._decode(row) for row in self._conn().execute(sql, params)]
+
+    @staticmethod
+    def _decode(row) -> dict:
+        doc = json_util.loads(row[1])
+        doc["_id"] = ObjectId(row[0]) if ObjectId.is_valid(row[0]) else row[0]
+        return doc
+
+    def find(self, filter=None, projection=None, sort=None, limit=0):
+        cursor = LocalCursor(self, filter, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.limit(limit)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        docs = list(self.find(filter, projection, sort=sort, limit=1))
+        return docs[0] if docs else None
+
+    def count_documents(self, filter=None, **kwargs) -> int:
+        where, params = _where(filter)
+        return self._conn().execute(f"SELECT COUNT(*) FROM {self.name} WHERE {where}", params).fetchone()[0]
+
+    def estimated_document_count(self) -> int:
+        return self.count_documents({})
+
+    def aggregate(self, pipeline: list, **kwargs) -> List[dict]:
+        # Push the leading $match/$sort/$skip/$limit stages down into SQL
+        filter, sort, limit, skip = {}, None, 0, 0
+        stages = list(pipeline)
+        while stages and next(iter(stages[0])) in ("$match", "$sort", "$skip", "$limit"):
+            op, arg = next(iter(stages.pop(0).items()))
+            if op == "$match":
+                if sort or limit or skip:
+                    stages.insert(0, {op: arg})
+                    break
+                filter = {"$and": [filter, arg]} if filter else arg
+            elif op == "$sort":
+                if limit or skip:
+                    stages.insert(0, {op: arg})
+                    break
+                sort = list(arg.items())
+            elif op == "$skip":
+                skip += arg
+            elif op == "$limit":
+                limit = arg if not limit else min(limit, arg)
+
+        if stages and not sort and not limit and not skip and "$group" in stages[0]:
+            grouped = self._group_in_sql(filter, stages[0]["$group"])
+            if grouped is not None:
+                return self._run_stages(grouped, stages[1:])
+        return self._run_stages(self._select(filter, sort, limit, skip), stages)
+
+    def _group_in_sql(self, filter: dict, spec: dict) -> Optional[List[dict]]:
+        """Run a $group on plain field paths as SQL GROUP BY; None if it needs Python"""
+        group_id = spec["_id"]
+        # Output name -> field path of each group key column; a compound key groups by all of them
+        if group_id is None:
+            keys = {}
+        elif isinstance(group_id, str) and group_id.startswith("$"):
+            keys = {None: group_id[1:]}
+        elif isinstance(group_id, dict) and group_id and all(
+            isinstance(path, str) and path.startswith("$") and not name.startswith("$") for name, path in group_id.items()
+        ):
+            keys = {name: path[1:] for name, path in group_id.items()}
+        else:
+            return None
+        selects = []
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, arg = next(iter(accumulator.items()))
+            if op not in _SQL_ACCUMULATORS:
+                return None
+            if isinstance(arg, str) and arg.startswith("$"):
+                selects.append(f"{_SQL_ACCUMULATORS[op]}({_column(arg[1:])})")
+            elif op == "$sum" and isinstance(arg, (int, float)):
+                selects.append(f"SUM({arg})")
+            else:
+                return None
+        where, params = _where(filter)
+        columns = [_column(path) for path in keys.values()] or ["NULL"]
+        sql = f"SELECT {', '.join(columns + selects)} FROM {self.name} WHERE {where}"
+        if keys:
+            sql += f" GROUP BY {', '.join(columns)}"
+        rows = self._conn().execute(sql, params).fetchall()
+        fields = [f for f in spec if f != "_id"]
+        results = []
+        for row in rows:
+            values = row[len(columns):]
+            if not keys and values and all(v is None for v in values) and not self.count_documents(filter):
+                continue  # Mongo returns no group at all for an empty input
+            if isinstance(group_id, dict):
+                key = dict(zip(keys, row[:len(columns)]))
+            else:
+                key = row[0]
+            results.append({"_id": key, **dict(zip(fields, values))})
+        return results
+
+    def _run_stages(self, docs: List[dict], stages: list) -> List[dict]:
+        for stage in stages:
+            op, arg = next(iter(stage.items()))
+            if op == "$match":
+                docs = [d for d in docs if self._matches(d, arg)]
+            elif op == "$sort":
+                docs = _sort_docs(docs, arg)
+            elif op == "$skip":
+                docs = docs[arg:]
+            elif op == "$limit":
+                docs = docs[:arg]
+            elif op == "$project":
+                docs = [_project(d, arg) for d in docs]
+            elif op == "$group":
+                docs = _group(docs, arg)
+            elif op == "$count":
+                docs = [{arg: len(docs)}] if docs else []
+            else:
+                raise OperationFailure(f"Unsupported aggregation stage: {op}")
+        return docs
+
+    @staticmethod
+    def _matches(doc: dict, filter: dict) -> bool:
+        """Evaluate a $match that follows $group/$project stages in Python"""
+        for field, condition in filter.items():
+            value = _get_path(doc, field)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                for op, expected in condition.items():
+                    if op == "$in" and value not in expected:
+                        return False
+                    if op == "$nin" and value in expected:
+                        return False
+                    if op == "$ne" and value == expected:
+                        return False
+                    if op in ("$lt", "$lte", "$gt", "$gte"):
+                        if value is None:
+                            return False
+                        if op == "$lt" and not value < expected:
+                            return False
+                        if op == "$lte" and not value <= expected:
+                            return False
+                        if op == "$gt" and not value > expected:
+                            return False
+                        if op == "$gte" and not value >= expected:
+                            return False
+            elif value != condition:
+                return False
+        return True
+
+    # Writes
+
+    def insert_one(self, document: dict) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        self._conn().execute(
+            f"INSERT INTO {self.name} (id, doc) VALUES (?, ?)",
+            (str(document["_id"]), json_util.dumps({k: v for k, v in document.items() if k != "_id"}))
+        )
+        return InsertOneResult(document["_id"])
+
+    def insert_many(self, documents: list, ordered: bool = True) -> InsertManyResult:
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        rows = [(str(d["_id"]), json_util.dumps({k: v for k, v in d.items() if k != "_id"})) for d in documents]
+        verb = "INSERT" if ordered else "INSERT OR IGNORE"
+        # One transaction instead of a commit per row
+        with self._transaction() as conn:
+            conn.executemany(f"{verb} INTO {self.name} (id, doc) VALUES (?, ?)", rows)
+        return InsertManyResult([d["_id"] for d in documents])
+
+    def delete_one(self, filter: dict) -> DeleteResult:
+        where, params = _where(filter)
+        cursor = self._conn().execute(
+            f"DELETE FROM {self.name} WHERE id IN (SELECT id FROM {self.name} WHERE {where} LIMIT 1)", params
+        )
+        return DeleteResult(cursor.rowcount)
+
+    def delete_many(self, filter: dict) -> DeleteResult:
+        where, params = _where(filter)
+        cursor = self._conn().execute(f"DELETE FROM {self.name} WHERE {where}", params)
+        return DeleteResult(cursor.rowcount)
+
+    def find_one_and_delete(self, filter: dict, projection=None):
+        # The write lock is taken before the read, so concurrent callers never get the same document
+        with self._transaction() as conn:
+            doc = self.find_one(filter)
+            if doc is None:
+                return None
+            conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (str(doc["_id"]),))
+        return _project(doc, projection) if projection else doc
+
+    # Indexes and change streams
+
+    def create_index(self, keys, **kwargs) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = f"{self.name}_" + "_".join(f"{f.replace('.', '_')}_{d}" for f, d in keys).replace("-", "n")
+        columns = ", ".join(f"{_column(f)} {'DESC' if d == -1 else 'ASC'}" for f, d in keys)
+        self._conn().execute(f"CREATE INDEX IF NOT EXISTS {name} ON {self.name} ({columns})")
+        return name
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("Change streams are not supported by the local store", code=CHANGE_STREAM_NOT_SUPPORTED)
+
+
+class LocalDatabase:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> LocalCollection:
+        if name not in self._collections:
+            self._collections[name] = LocalCollection(self, name)
+        return self._collections[name]
+
+    def command(self, command: str, *args, **kwargs) -> dict:
+        if command == "ping":
+            self.client.connection().execute("SELECT 1")
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command: {command}")
+
+    def list_collection_names(self) -> List[str]:
+        rows = self.client.connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return [row[0] for row in rows]
+
+
+class LocalClient:
+    """Drop-in for MongoClient backed by one SQLite file (one connection per thread)"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._databases = {}
+        self.admin = LocalDatabase(self, "admin")
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("regexp", 3, _regexp, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def __getitem__(self, name: str) -> LocalDatabase:
+        # A single file holds one database; the name is kept for API compatibility
+        if name not in self._databases:
+            self._databases[name] = LocalDatabase(self, name)
+        return self._databases[name]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def sync_to_mongo(local: LocalClient, mongo_db, collections: List[str], batch_size: int = 1000) -> dict:
+    """Bulk-upload local collections into Mongo, preserving IDs; safe to re-run"""
+    from pymongo.errors import BulkWriteError
+
+    uploaded = {}
+    for name in collections:
+        source = local["local"][name]
+        total, last_id = 0, None
+        while True:
+            # Keyset pagination over the primary key keeps memory flat for large tables
+            filter = {"_id": {"$gt": last_id}} if last_id else {}
+            batch = source._select(filter, [("_id", 1)], batch_size)
+            if not batch:
+                break
+            try:
+                mongo_db[name].insert_many(batch, ordered=False)
+                total += len(batch)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != 11000 for err in errors):
+                    raise
+                total += len(batch) - len(errors)
+            last_id = batch[-1]["_id"]
+        uploaded[name] = total
+    return uploaded
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description="Local SQLite store tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync = subparsers.add_parser("sync", help="Bulk-upload local data into MongoDB")
+    sync.add_argument("--sqlite", default=SQLITE_PATH)
+    sync.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    sync.add_argument("--db", default=os.getenv("DB_NAME", "inovix_portal"))
+    sync.add_argument("--collections", nargs="+", default=["ratings", "quiz_scores", "quiz_arena"])
+    sync.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = sync_to_mongo(LocalClient(args.sqlite), MongoClient(args.mongo_url)[args.db], args.collections, args.batch_size)
+    for name, count in result.items():
+        print(f"{name}: {count} documents uploaded")
@@ -0,0 +1,81 @@
+"""
+Read-preference routing for admin and analytics endpoints.
+
+The admin lists and stats aggregations read through
+`read_routing.analytics(c)`, which returns a handle on `c` with the
+analytics read preference (by default secondaryPreferred with a max
+staleness bound), so they are served by replica set secondaries when one
+is available. Submits, percentile counts, the leaderboard, search and
+deletes keep using the plain collections and therefore the primary.
+
+The response cache is invalidated by writes, so a lagging secondary read
+right after one would be cached until the TTL expires. While
+`may_read_secondaries` is set, routed endpoints are therefore not cached.
+
+Against a standalone mongod, or the embedded SQLite store, every read goes
+to the one server, routed responses are cached like any other, and the
+policy is reported as-is in /api/metrics.
+"""
+
+from typing import Dict
+
+from pymongo.read_preferences import ReadPreference, make_read_preference, read_pref_mode_from_name
+
+# Server selection refuses smaller bounds (heartbeat interval + 10s, at least 90s)
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+def build_read_preference(mode: str, max_staleness_seconds: int = -1):
+    """Read preference from a mode name such as "secondaryPreferred"; -1 disables the staleness bound"""
+    try:
+        mode_id = read_pref_mode_from_name(mode)
+    except ValueError:
+        raise ValueError(f"Unknown read preference: {mode}") from None
+    if max_staleness_seconds != -1:
+        if mode == "primary":
+            raise ValueError("Read preference 'primary' cannot have a max staleness")
+        if max_staleness_seconds < MIN_MAX_STALENESS_SECONDS:
+            raise ValueError(f"Max staleness must be -1 or at least {MIN_MAX_STALENESS_SECONDS} seconds")
+    return make_read_preference(mode_id, None, max_staleness_seconds)
+
+
+class ReadRouting:
+    """Analytics collection handles plus the policy and per-collection read counts for metrics"""
+
+    def __init__(self, client, collections: list, mode: str, max_staleness_seconds: int = -1):
+        self.client = client
+        self.preference = build_read_preference(mode, max_staleness_seconds)
+        self._analytics = {c.name: c.with_options(read_preference=self.preference) for c in collections}
+        self._reads: Dict[str, int] = {}
+
+    def _topology(self) -> str:
+        topology = getattr(self.client, "topology_description", None)
+        name = getattr(topology, "topology_type_name", None)
+        return name if isinstance(name, str) else "embedded"
+
+    @property
+    def may_read_secondaries(self) -> bool:
+        """Whether analytics reads can be served by a (possibly lagging) secondary
+
+        Until the first connection has discovered the topology, it may.
+        """
+        return self.preference != ReadPreference.PRIMARY and self._topology() not in ("Single", "embedded")
+
+    def analytics(self, collection):
+        """Handle on `collection` for admin/analytics reads"""
+        self._reads[collection.name] = self._reads.get(collection.name, 0) + 1
+        return self._analytics.get(collection.name, collection)
+
+    def stats(self) -> dict:
+        return {
+            "default": "primary",
+            "analytics": {
+                "mode": self.preference.mongos_mode,
+                "max_staleness_seconds": self.preference.max_staleness,
+            },
+            # "ReplicaSetWithPrimary" when secondaries can actually take the analytics reads
+            "topology": self._topology(),
+            # Routed responses are not cached while they may come from a secondary
+            "cached": not self.may_read_secondaries,
+            "analytics_reads": dict(self._reads),
+        }
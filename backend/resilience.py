@@ -0,0 +1,385 @@
+"""
+Degraded read-only mode for when MongoDB is unavailable.
+
+- CircuitBreaker: opens after consecutive connection failures so requests
+  fail fast instead of waiting for server selection timeouts.
+- SnapshotStore: last good response of the display endpoints (leaderboard,
+  stats), persisted to disk and served with `X-Data-Stale: true` while the
+  database is unreachable. Filtered requests have their own snapshots, so
+  the store keeps only the SNAPSHOT_MAX_ENTRIES most recently used.
+- SubmissionSpool: submissions that cannot be written are appended to a
+  local JSON-lines file per collection and replayed once Mongo is back.
+
+Several workers may share SNAPSHOT_DIR and SPOOL_DIR. Snapshots are
+written through per-process temporary files. Spool appends and replay
+claims take an flock on SPOOL_DIR/.lock, and a replaying worker first
+renames the spool to a claim file named after its PID, so a document
+appended meanwhile is never lost and no two workers replay the same file.
+"""
+
+import fcntl
+import functools
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import orjson
+from bson import ObjectId, json_util
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "15"))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(BASE_DIR, "cache", "snapshots"))
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "30"))
+# Filtered requests get their own snapshots; the least recently used beyond this are dropped
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "64"))
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(BASE_DIR, "cache", "spool"))
+SPOOL_REPLAY_INTERVAL = float(os.getenv("SPOOL_REPLAY_INTERVAL", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+def is_database_unavailable(exc: BaseException) -> bool:
+    """True if `exc` or the exception it was raised from is a Mongo connection failure"""
+    while exc is not None:
+        if isinstance(exc, ConnectionFailure):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after a timeout"""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a database call should be attempted (half-open lets a trial through)"""
+        if self.state == "open":
+            self._stats["rejected"] += 1
+            return False
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self._stats["opened"] += 1
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, **self._stats}
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class SnapshotStore:
+    """Last good JSON body per key, kept in memory and persisted at most every `interval` seconds
+
+    At most `max_entries` keys are kept, in memory and on disk; the least
+    recently used are evicted with their files.
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, interval: float = SNAPSHOT_INTERVAL,
+                 max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.directory = directory
+        self.interval = interval
+        self.max_entries = max_entries
+        self._snapshots: OrderedDict = OrderedDict()  # key -> (saved_at datetime, body bytes)
+        self._persisted_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, snapshot: tuple):
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            evicted = []
+            while len(self._snapshots) > self.max_entries:
+                evicted.append(self._snapshots.popitem(last=False)[0])
+                self._persisted_at.pop(evicted[-1], None)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _prune_files(self):
+        """Drop the oldest files beyond `max_entries`, including those of other workers and earlier runs"""
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        if len(paths) <= self.max_entries:
+            return
+        for path in sorted(paths, key=_mtime)[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def save(self, key: str, body: bytes):
+        self._remember(key, (datetime.utcnow(), body))
+        now = time.monotonic()
+        if now - self._persisted_at.get(key, 0) < self.interval:
+            return
+        self._persisted_at[key] = now
+        os.makedirs(self.directory, exist_ok=True)
+        # Per-process name: other workers may be saving the same key
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({"saved_at": self._snapshots[key][0].isoformat(), "body": orjson.Fragment(body)}))
+        os.replace(tmp_path, self._path(key))
+        self._prune_files()
+
+    def load(self, key: str) -> Optional[tuple]:
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = orjson.loads(f.read())
+                snapshot = (datetime.fromisoformat(data["saved_at"]), orjson.dumps(data["body"]))
+            except (OSError, ValueError, KeyError):
+                return None
+        self._remember(key, snapshot)
+        return snapshot
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {key: saved_at.isoformat() for key, (saved_at, _) in self._snapshots.items()}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SubmissionSpool:
+    """Append-only JSON-lines spool of documents waiting to be inserted
+
+    `<collection>.jsonl` receives appends. Replay renames it to
+    `<collection>.<pid>.<n>.replay`, inserts the claimed documents and
+    deletes the claim. Claims left behind by a worker that died are taken
+    over by the next replay.
+    """
+
+    def __init__(self, directory: str = SPOOL_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # Claims of this process are only replayed by one thread at a time
+        self._replay_lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.jsonl")
+
+    def _claim_path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.replay")
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across threads and across workers sharing the directory"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, collection_name: str, doc: dict):
+        with self._locked():
+            with open(self._path(collection_name), "a") as f:
+                f.write(json_util.dumps(doc) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def pending(self) -> Dict[str, int]:
+        """Spooled documents per collection, including claimed ones not yet replayed"""
+        counts = {}
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.endswith((".jsonl", ".replay")):
+                    name = filename.split(".", 1)[0]
+                    with open(os.path.join(self.directory, filename)) as f:
+                        counts[name] = counts.get(name, 0) + sum(1 for line in f if line.strip())
+        return counts
+
+    def _claim(self, collection_name: str) -> list:
+        """Take the spool file and orphaned claims of `collection_name` for this process"""
+        pid = os.getpid()
+        claims = []
+        with self._locked():
+            path = self._path(collection_name)
+            if os.path.exists(path):
+                claim = self._claim_path(collection_name)
+                os.rename(path, claim)
+                claims.append(claim)
+            for claim in glob.glob(os.path.join(self.directory, f"{glob.escape(collection_name)}.*.replay")):
+                owner = int(os.path.basename(claim).split(".")[1])
+                if owner == pid:
+                    # Left by an earlier replay of ours that failed
+                    if claim not in claims:
+                        claims.append(claim)
+                elif not _pid_alive(owner):
+                    taken = self._claim_path(collection_name)
+                    os.rename(claim, taken)
+                    claims.append(taken)
+        return claims
+
+    def replay(self, collections: dict) -> Dict[str, int]:
+        """Insert spooled documents into `collections` (name -> collection); returns counts replayed"""
+        replayed = {}
+        with self._replay_lock:
+            for name, collection in collections.items():
+                for claim in self._claim(name):
+                    with open(claim) as f:
+                        docs = [json_util.loads(line) for line in f if line.strip()]
+                    if docs:
+                        try:
+                            # Spooled documents keep their _id, so a partially applied replay is idempotent
+                            collection.insert_many(docs, ordered=False)
+                        except BulkWriteError as e:
+                            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                                raise
+                    # Only removed once inserted; a failed claim is retried by the next replay
+                    os.remove(claim)
+                    replayed[name] = replayed.get(name, 0) + len(docs)
+        return replayed
+
+
+class Resilience:
+    """Ties the breaker, snapshots and spool together for the API endpoints"""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.snapshots = SnapshotStore()
+        self.spool = SubmissionSpool()
+        self._stats = {"stale_served": 0, "spooled": 0, "replayed": 0}
+
+    def read(self, snapshot_key: Optional[str] = None):
+        """Decorate a read endpoint: fail fast while the breaker is open, serving a snapshot if one exists"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = None
+                if snapshot_key:
+                    params = "&".join(
+                        f"{k}={kwargs[k]}" for k in sorted(kwargs)
+                        if kwargs[k] is not None and not isinstance(kwargs[k], Request)
+                    )
+                    # Hash params so client-supplied values never end up in file names
+                    key = f"{snapshot_key}_{hashlib.sha1(params.encode()).hexdigest()[:12]}" if params else snapshot_key
+
+                if not self.breaker.allow():
+                    return self._stale(key)
+                try:
+                    result = await func(*args, **kwargs)
+                except HTTPException as e:
+                    if not is_database_unavailable(e):
+                        raise
+                    self.breaker.record_failure()
+                    return self._stale(key)
+                self.breaker.record_success()
+
+                if key:
+                    if isinstance(result, Response):
+                        if result.status_code == 200:
+                            self.snapshots.save(key, result.body)
+                    else:
+                        body = orjson.dumps(result)
+                        self.snapshots.save(key, body)
+                        result = Response(content=body, media_type="application/json")
+                return result
+            return wrapper
+        return decorator
+
+    def _stale(self, key: Optional[str]) -> Response:
+        snapshot = self.snapshots.load(key) if key else None
+        if snapshot is None:
+            raise HTTPException(status_code=503, detail="Database is unavailable", headers={"Retry-After": "5"})
+        self._stats["stale_served"] += 1
+        saved_at, body = snapshot
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"X-Data-Stale": "true", "X-Snapshot-Saved-At": saved_at.isoformat()}
+        )
+
+    def insert(self, collection, doc: dict) -> tuple:
+        """Insert a document, spooling it locally if Mongo is unavailable; returns (id, queued)"""
+        if self.breaker.allow():
+            try:
+                result = collection.insert_one(doc)
+                self.breaker.record_success()
+                return str(result.inserted_id), False
+            except ConnectionFailure:
+                self.breaker.record_failure()
+        # Assign the ID now so clients get a stable one and replay stays idempotent
+        doc.setdefault("_id", ObjectId())
+        self.spool.append(collection.name, doc)
+        self._stats["spooled"] += 1
+        return str(doc["_id"]), True
+
+    def replay(self, collections: dict, on_replayed: Callable[[str], None] = None):
+        """Replay spooled submissions when the breaker lets database calls through"""
+        if not self.breaker.allow():
+            return
+        try:
+            replayed = self.spool.replay(collections)
+        except ConnectionFailure:
+            self.breaker.record_failure()
+            return
+        for name, count in replayed.items():
+            self._stats["replayed"] += count
+            logger.info("Replayed %d spooled documents into %s", count, name)
+            if on_replayed:
+                on_replayed(name)
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "snapshots": self.snapshots.stats(),
+            "spool_pending": self.spool.pending(),
+            **self._stats,
+        }
+
+
+resilience = Resilience()
@@ -0,0 +1,188 @@
+"""
+Response cache for read endpoints, invalidated by per-collection write versions.
+
+Every write path calls `response_cache.bump(<collection name>)`. Cached
+entries are keyed by endpoint + params + the current version of each
+collection the endpoint reads, so a write makes older entries unreachable
+and they age out of the LRU.
+
+With RESPONSE_CACHE_SHARED_PATH set, versions and rendered responses are
+also kept in a SQLite file so several workers on one host share them.
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SHARED_PATH = os.getenv("RESPONSE_CACHE_SHARED_PATH", "")
+
+
+class SharedStore:
+    """SQLite-backed versions and entries shared by workers on the same host"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, collection: str) -> int:
+        row = self._conn().execute("SELECT version FROM versions WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, collection: str):
+        self._conn().execute(
+            "INSERT INTO versions (collection, version) VALUES (?, 1) "
+            "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+            (collection,)
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+class ResponseCache:
+    """In-process LRU of rendered JSON responses with size and TTL bounds"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL,
+                 shared_path: str = RESPONSE_CACHE_SHARED_PATH, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.shared = SharedStore(shared_path, max_entries) if shared_path else None
+        self._versions = {}
+        self._entries = OrderedDict()  # key -> (expires_at, body)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "shared_hits": 0, "misses": 0, "bumps": 0, "bypassed": 0}
+
+    def version(self, collection: str) -> int:
+        if self.shared:
+            return self.shared.version(collection)
+        return self._versions.get(collection, 0)
+
+    def bump(self, collection: str):
+        """Invalidate every cached response that depends on `collection`"""
+        self._stats["bumps"] += 1
+        if self.shared:
+            self.shared.bump(collection)
+        else:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+        if self.shared:
+            body = self.shared.get(key)
+            if body is not None:
+                self._stats["shared_hits"] += 1
+                self._put(key, body)
+                return body
+        self._stats["misses"] += 1
+        return None
+
+    def _put(self, key: str, body: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, *collections: str, bypass: Optional[Callable[[Request], bool]] = None):
+        """Decorate an async endpoint whose result depends only on its params and `collections`
+
+        Apply it outside `resilience.read` so a cached body is served
+        before the circuit breaker is consulted. Requests for which
+        `bypass(request)` is true are neither served from nor stored in
+        the cache.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                if bypass is not None:
+                    request = next((v for v in kwargs.values() if isinstance(v, Request)), None)
+                    if request is not None and bypass(request):
+                        self._stats["bypassed"] += 1
+                        return await func(*args, **kwargs)
+
+                versions = ",".join(f"{c}:{self.version(c)}" for c in collections)
+                # The Request an endpoint takes for app state is not a parameter of the response
+                params = "&".join(f"{k}={kwargs[k]}" for k in sorted(kwargs) if not isinstance(kwargs[k], Request))
+                key = f"{func.__name__}?{params}#{versions}"
+
+                body = self._get(key)
+                if body is None:
+                    result = await func(*args, **kwargs)
+                    if isinstance(result, Response):
+                        # Errors and stale snapshots served while the database is down are not cached
+                        if result.status_code != 200 or "x-data-stale" in result.headers:
+                            return result
+                        body = result.body
+                    else:
+                        body = orjson.dumps(result)
+                    self._put(key, body)
+                    if self.shared:
+                        self.shared.set(key, body, self.ttl)
+                return Response(content=body, media_type="application/json")
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "shared": bool(self.shared),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **self._stats,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,273 @@
+"""
+Generate synthetic booth data and profile endpoints as the collections grow.
+
+Ratings, quiz scores and quiz arena results are bulk-inserted with
+insert_many in batches, following the shapes the apps submit: star ratings
+skewed high, a few companies with most of the ratings, optional inline
+base64 photos of a configurable size, binomial quiz results and log-normal
+answer times. For each dataset size the collections are topped up and the
+endpoints are called through the real app (response cache and admission
+control off) to record latency percentiles, the peak Python memory used per
+request and the response size. The report gives one curve per endpoint plus
+a log-log slope: ~0 is constant, ~1 linear in dataset size.
+
+Data goes to a separate database (or SQLite file) that is dropped afterwards
+unless --keep is given.
+
+Usage: python scale_profiler.py [--sizes 10000 100000 1000000] [--photo-bytes 0 30000]
+                                [--sqlite PATH] [--report report.json]
+"""
+
+import argparse
+import base64
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+
+PROFILE_DB_NAME = "inovix_portal_profile"
+ARENA_QUESTIONS = 15
+QUIZ_QUESTIONS = 10
+
+STAR_WEIGHTS = [3, 5, 12, 30, 50]  # 1..5 stars, percent
+COMMENTS = [
+    "Skvělá obsluha a zajímavé produkty", "Great booth, very helpful staff", "Výborná káva",
+    "Chtěl bych víc informací o cenách", "Nice demo of the new line", "Dlouhá fronta u stánku",
+    "Friendly people, will come back", "Super kvíz!", "Could not find the catalog", "Děkuji za dárek",
+]
+NAMES = ["Jan", "Petra", "Tomáš", "Lucie", "Martin", "Eva", "Jakub", "Anna", "David", "Tereza", "Alex", "Sam"]
+
+# (label, method, path, JSON body); the submit also runs the percentile counts
+ENDPOINTS = [
+    ("GET /api/ratings", "get", "/api/ratings", None),
+    ("GET /api/ratings/stats", "get", "/api/ratings/stats", None),
+    ("GET /api/ratings/companies", "get", "/api/ratings/companies", None),
+    ("POST /api/quiz/submit", "post", "/api/quiz/submit", {"score": 70, "total_questions": 10, "correct_answers": 7}),
+    ("GET /api/quiz/stats", "get", "/api/quiz/stats", None),
+    ("GET /api/quiz-arena/leaderboard", "get", "/api/quiz-arena/leaderboard", None),
+    ("GET /api/quiz-arena/stats", "get", "/api/quiz-arena/stats", None),
+]
+
+
+class Generator:
+    """Realistic-looking documents for the three collections"""
+
+    def __init__(self, photo_sizes: List[int], photo_share: float, companies: int, seed: int = 42):
+        self.random = random.Random(seed)
+        self.photo_share = photo_share
+        # One random payload per size, reused; content does not matter to Mongo
+        self.photos = [
+            "data:image/jpeg;base64," + base64.b64encode(os.urandom(size * 3 // 4)).decode() for size in photo_sizes if size
+        ]
+        # Zipf-like: the first companies collect most of the ratings
+        self.companies = [f"Company {i}" for i in range(companies)]
+        self.company_weights = [1 / (i + 1) for i in range(companies)]
+        self.start = datetime(2025, 12, 1)
+
+    def _timestamp(self) -> str:
+        # Three event days, visits concentrated around the middle of the opening hours
+        day = self.random.randrange(3)
+        seconds = min(max(self.random.gauss(13.5 * 3600, 2.5 * 3600), 9 * 3600), 18 * 3600)
+        return (self.start + timedelta(days=day, seconds=seconds)).isoformat()
+
+    def rating(self) -> dict:
+        r = self.random
+        return {
+            "stars": r.choices(range(1, 6), STAR_WEIGHTS)[0],
+            "comment": r.choice(COMMENTS) if r.random() < 0.6 else "",
+            "photo": r.choice(self.photos) if self.photos and r.random() < self.photo_share else "",
+            "company": r.choices(self.companies, self.company_weights)[0] if r.random() < 0.8 else "",
+            "timestamp": self._timestamp(),
+        }
+
+    def _correct(self, questions: int) -> int:
+        skill = self.random.betavariate(5, 3)
+        return sum(self.random.random() < skill for _ in range(questions))
+
+    def quiz_score(self) -> dict:
+        correct = self._correct(QUIZ_QUESTIONS)
+        return {
+            "score": round(correct / QUIZ_QUESTIONS * 100),
+            "total_questions": QUIZ_QUESTIONS,
+            "correct_answers": correct,
+            "timestamp": self._timestamp(),
+        }
+
+    def arena_result(self) -> dict:
+        r = self.random
+        name = r.choice(NAMES)
+        return {
+            "name": f"{name} {r.randrange(100)}",
+            "correct_answers": self._correct(ARENA_QUESTIONS),
+            "total_questions": ARENA_QUESTIONS,
+            "average_time": round(r.lognormvariate(math.log(8), 0.5), 3),
+            "instagram": f"@{name.lower()}{r.randrange(1000)}" if r.random() < 0.3 else "",
+            "timestamp": self._timestamp(),
+        }
+
+
+def top_up(collection, make, target: int, batch_size: int) -> float:
+    """Insert documents until `collection` holds `target`; returns documents per second"""
+    missing = target - collection.count_documents({})
+    started = time.perf_counter()
+    inserted = 0
+    while inserted < missing:
+        batch = [make() for _ in range(min(batch_size, missing - inserted))]
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    elapsed = time.perf_counter() - started
+    return inserted / elapsed if inserted and elapsed else 0.0
+
+
+def profile_endpoint(client, method: str, path: str, body, repeat: int) -> dict:
+    call = getattr(client, method)
+    kwargs = {"json": body} if body is not None else {}
+    call(path, **kwargs)  # warm-up
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = call(path, **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+    response.raise_for_status()
+
+    # Separate pass, since tracing allocations slows everything down
+    tracemalloc.start()
+    call(path, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)], 2),
+        "peak_mib": round(peak / 2**20, 2),
+        "response_kib": round(len(response.content) / 1024, 1),
+    }
+
+
+def slope(points: List[tuple]) -> float:
+    """Least-squares slope of log(value) against log(size)"""
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return float("nan")
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else float("nan")
+
+
+def run(args) -> dict:
+    # Keep snapshots, spool and cache state of the profiling app away from the real ones
+    scratch = tempfile.mkdtemp(prefix="scale_profiler_")
+    for name in ("SNAPSHOT_DIR", "SPOOL_DIR", "CHANGE_TOKEN_DIR", "TILES_CACHE_DIR"):
+        os.environ[name] = os.path.join(scratch, name.lower())
+    os.environ["CHANGE_WATCHER_ENABLED"] = "0"
+
+    import server
+    from fastapi.testclient import TestClient
+
+    server.response_cache.enabled = False
+    server.admission_controller.enabled = False
+    overrides = {"db_name": args.db, "warm_up": False, "catalog_tiles_on_startup": False}
+    if args.sqlite:
+        overrides.update(storage_backend="sqlite", sqlite_path=args.sqlite)
+    else:
+        overrides["mongo_url"] = args.mongo_url
+    app = server.create_app(server.Settings(**overrides))
+
+    generator = Generator(args.photo_bytes, args.photo_share, args.companies)
+    endpoints = [e for e in ENDPOINTS if not args.endpoints or any(f in e[0] for f in args.endpoints)]
+    report = {
+        "storage": "sqlite" if args.sqlite else "mongo",
+        "photo_bytes": args.photo_bytes,
+        "photo_share": args.photo_share,
+        "repeat": args.repeat,
+        "sizes": [],
+        "endpoints": {label: [] for label, *_ in endpoints},
+    }
+
+    with TestClient(app) as client:
+        db = app.state.db
+        db.ensure_indexes()
+        collections = [
+            (db.ratings, generator.rating),
+            (db.quiz_scores, generator.quiz_score),
+            (db.quiz_arena, generator.arena_result),
+        ]
+        try:
+            for size in sorted(args.sizes):
+                rates = {c.name: round(top_up(c, make, size, args.batch_size)) for c, make in collections}
+                report["sizes"].append({"documents": size, "insert_docs_per_s": rates})
+                print(f"\n{size} documents per collection (inserted/s: {rates})", file=sys.stderr)
+                for label, method, path, body in endpoints:
+                    result = profile_endpoint(client, method, path, body, args.repeat)
+                    report["endpoints"][label].append({"documents": size, **result})
+                    print(f"  {label:<32} p50 {result['p50_ms']:>9.2f} ms  peak {result['peak_mib']:>8.2f} MiB", file=sys.stderr)
+        finally:
+            if not args.keep:
+                if args.sqlite:
+                    db.close()
+                    for suffix in ("", "-wal", "-shm"):
+                        if os.path.exists(args.sqlite + suffix):
+                            os.remove(args.sqlite + suffix)
+                else:
+                    db.client.drop_database(args.db)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    for label, curve in report["endpoints"].items():
+        report.setdefault("scaling", {})[label] = {
+            "latency_slope": round(slope([(p["documents"], p["p50_ms"]) for p in curve]), 2),
+            "memory_slope": round(slope([(p["documents"], p["peak_mib"]) for p in curve]), 2),
+        }
+    return report
+
+
+def print_report(report: dict):
+    sizes = [s["documents"] for s in report["sizes"]]
+    print(f"storage={report['storage']} photo_bytes={report['photo_bytes']} photo_share={report['photo_share']}")
+    header = f"{'endpoint':<32}" + "".join(f"{size:>12}" for size in sizes) + f"{'slope':>8}"
+    for metric, unit in (("p50_ms", "p50 latency, ms"), ("peak_mib", "peak Python memory, MiB")):
+        print(f"\n{unit}\n{header}")
+        slope_key = "latency_slope" if metric == "p50_ms" else "memory_slope"
+        for label, curve in report["endpoints"].items():
+            values = "".join(f"{point[metric]:>12.2f}" for point in curve)
+            print(f"{label:<32}{values}{report['scaling'][label][slope_key]:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Documents per collection to profile at")
+    parser.add_argument("--photo-bytes", type=int, nargs="+", default=[0],
+                        help="Inline photo sizes to draw from (base64 characters); 0 for no photos")
+    parser.add_argument("--photo-share", type=float, default=0.2, help="Share of ratings with a photo")
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Documents per insert_many call")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per endpoint and size")
+    parser.add_argument("--endpoints", nargs="*", help="Only profile endpoints whose label contains one of these")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=PROFILE_DB_NAME, help="Database to fill; dropped afterwards")
+    parser.add_argument("--sqlite", help="Profile the embedded SQLite store at this path instead of MongoDB")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data")
+    parser.add_argument("--report", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+    if not args.sqlite and args.db == os.getenv("DB_NAME", "inovix_portal"):
+        parser.error("--db must not be the application database; it is dropped afterwards")
+    if args.sqlite and os.path.exists(args.sqlite) and not args.keep:
+        parser.error("--sqlite file exists and would be deleted afterwards; pass --keep to reuse it")
+
+    result = run(args)
+    print_report(result)
+    if args.report:
+        with open(args.report, "wb") as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
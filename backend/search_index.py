@@ -0,0 +1,343 @@
+"""
+In-process full-text index over rating comments and companies.
+
+Text is folded to lowercase ASCII ("Skvělá káva" -> "skvela kava") so
+queries match with or without Czech diacritics, and common Czech/English
+stop words are dropped. Query terms also match indexed words they are a
+prefix of, after stripping one Czech case ending, so other forms of a
+word match too ("kav" and "kavu" both find "kava" and "kavou"). Hits
+are ranked with BM25, company matches weighing more than comment
+matches.
+
+The index is used instead of a Mongo text index because that has no
+Czech analyzer and the embedded SQLite backend has no $text at all.
+This worker's writes update it directly, and writes seen by the change
+watcher update it by ID. Events without an ID (polling, lost change
+stream history) and bulk writes trigger a refresh. It compares the
+collection's count and newest _id with the index and first tries to
+catch up on newer documents only. If that is not enough, it rebuilds
+from a projection without photos. Rebuilds scan into a separate index
+while searches keep using the current one, then swap it in.
+"""
+
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from change_events import ChangeWatcher
+
+SEARCH_MIN_PREFIX = int(os.getenv("SEARCH_MIN_PREFIX", "3"))
+# Per-field weights applied to term frequencies
+SEARCH_FIELDS = {"comment": 1.0, "company": 2.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOP_WORDS = frozenset("""
+a aby ale ani ano asi az bez bude by byl byla bylo byt co do i jak jako je jeho jej jen jeste ji jsem jsme jsou
+jste k kde kdyz ke ktera ktere ktery ma mate me mi mit mne mu na nad nebo neni ni od po pod pro proto protoze
+se si sve ta tak take tam te ten tento to tu ty u uz v ve vsak z za ze
+an and are as at be but by for from has have in is it its of on or so that the this to was were with
+""".split())
+
+# Czech case endings stripped from query terms, longest first, before prefix matching
+CZECH_SUFFIXES = ("ami", "ech", "ich", "ove", "ou", "em", "ho", "mu", "a", "e", "i", "o", "u", "y")
+
+_WORD = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [t for t in _WORD.findall(fold(text or "")) if t not in STOP_WORDS and (len(t) > 1 or t.isdigit())]
+
+
+def stem(term: str, min_length: int = SEARCH_MIN_PREFIX) -> str:
+    """Strip one Czech case ending ("kavu" -> "kav") if enough of the word is left"""
+    for suffix in CZECH_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= min_length:
+            return term[:-len(suffix)]
+    return term
+
+
+class RatingSearchIndex:
+    """Inverted index of term -> {rating id: weighted term frequency}"""
+
+    def __init__(self, fields: Dict[str, float] = None, min_prefix: int = SEARCH_MIN_PREFIX):
+        self.fields = SEARCH_FIELDS if fields is None else fields
+        self.min_prefix = min_prefix
+        self.collection = None
+        self.stale = True
+        self.built = False
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups; rebuilt lazily
+        self._vocabulary_dirty = False
+        self._lock = threading.RLock()
+        # Updates made while a rebuild scans, replayed onto the new index before the swap
+        self._journal: Optional[list] = None
+        self._rebuild_lock = threading.Lock()
+        self._refreshing = False
+        self._subscribers: List[Callable[[], None]] = []
+        self._stats = {"rebuilds": 0, "catch_ups": 0, "searches": 0}
+
+    def subscribe(self, callback: Callable[[], None]):
+        """Register `callback()`; called from the refresh thread after a background refresh changed the index"""
+        self._subscribers.append(callback)
+
+    def _projection(self) -> dict:
+        return {field: 1 for field in self.fields}
+
+    # Maintenance
+
+    def add(self, doc: dict):
+        """Index (or re-index) a rating document"""
+        doc_id = str(doc["_id"])
+        terms = Counter()
+        for field, weight in self.fields.items():
+            for token in tokenize(doc.get(field)):
+                terms[token] += weight
+        with self._lock:
+            self._add(doc_id, terms)
+            if self._journal is not None:
+                self._journal.append(("_add", doc_id, terms))
+
+    def _add(self, doc_id: str, terms: Counter):
+        self._remove(doc_id)
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[doc_id] = frequency
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(str(doc_id))
+            if self._journal is not None:
+                self._journal.append(("_remove", str(doc_id)))
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            if self._journal is not None:
+                self._journal.append(("_clear",))
+
+    def _clear(self):
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._total_length = 0.0
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def mark_stale(self):
+        """Note writes the index has not seen; a built index starts catching up in the background"""
+        self.stale = True
+        if self.built:
+            self._refresh_in_background()
+
+    def rebuild(self, collection=None):
+        """Re-read every rating (indexed fields only) from `collection`
+
+        The scan fills a separate index; searches keep using the current
+        one until it is swapped in, with updates made meanwhile replayed.
+        """
+        if collection is not None:
+            self.collection = collection
+        with self._rebuild_lock:
+            self._rebuild()
+
+    def _build_once(self):
+        """First build; concurrent first searches (or warm-up) share one scan"""
+        with self._rebuild_lock:
+            if not self.built:
+                self._rebuild()
+
+    def _rebuild(self):
+        """Scan into a new index and swap it in; the caller holds _rebuild_lock"""
+        with self._lock:
+            # Reset before scanning so an invalidation arriving mid-scan triggers another refresh
+            self.stale = False
+            self._journal = []
+        fresh = RatingSearchIndex(self.fields, self.min_prefix)
+        try:
+            for doc in self.collection.find({}, self._projection()):
+                fresh.add(doc)
+        except Exception:
+            with self._lock:
+                self._journal = None
+                self.stale = True
+            raise
+        with self._lock:
+            for method, *args in self._journal:
+                getattr(fresh, method)(*args)
+            self._journal = None
+            self._postings, self._doc_terms = fresh._postings, fresh._doc_terms
+            self._doc_lengths, self._total_length = fresh._doc_lengths, fresh._total_length
+            self._vocabulary_dirty = True
+            self.built = True
+            self._stats["rebuilds"] += 1
+
+    def refresh(self) -> bool:
+        """Catch up with writes this worker did not see, rebuilding only if inserts do not explain them
+
+        Returns whether the index had to change.
+        """
+        if self.collection is None:
+            return False
+        self.stale = False
+        try:
+            count, newest = ChangeWatcher.fingerprint(self.collection)
+            with self._lock:
+                indexed, indexed_newest = len(self._doc_terms), max(self._doc_terms, default=None)
+            if (count, str(newest) if newest else None) == (indexed, indexed_newest):
+                return False
+            if count > indexed and indexed_newest is not None and ObjectId.is_valid(indexed_newest):
+                # Usually inserts by other workers: index only documents newer than ours
+                for doc in self.collection.find({"_id": {"$gt": ObjectId(indexed_newest)}}, self._projection()):
+                    self.add(doc)
+                with self._lock:
+                    self._stats["catch_ups"] += 1
+                    if len(self._doc_terms) == count:
+                        return True
+            self.rebuild()
+            return True
+        except Exception:
+            self.stale = True
+            raise
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="search-index-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            changed = False
+            # Invalidations arriving during a refresh are caught by another round
+            while self.stale:
+                changed = self.refresh() or changed
+        except Exception:
+            logger.exception("Refreshing the rating search index failed")
+        finally:
+            self._refreshing = False
+        if changed:
+            # Searches answered from the old index may have been cached meanwhile
+            for callback in self._subscribers:
+                try:
+                    callback()
+                except Exception:
+                    logger.exception("Search index subscriber failed")
+
+    def handle_change(self, event: dict):
+        """ChangeWatcher subscriber; runs in the watcher's thread"""
+        if event["collection"] != getattr(self.collection, "name", None):
+            return
+        operation, doc_id = event["operation"], event["document_id"]
+        if operation == "delete" and doc_id:
+            self.remove(doc_id)
+        elif operation in ("insert", "replace", "update") and doc_id:
+            doc = self.collection.find_one({"_id": ObjectId(doc_id)}, self._projection())
+            if doc is None:
+                self.remove(doc_id)
+            else:
+                self.add(doc)
+        else:
+            self.mark_stale()
+
+    # Queries
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Indexed terms matching a query term: itself, plus words sharing its stem at reduced weight"""
+        if len(term) < self.min_prefix:
+            return [(term, 1.0)] if term in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        prefix = stem(term, self.min_prefix)
+        matches = []
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(prefix):
+                break
+            # Other forms and longer completions are weaker evidence of what was meant
+            matches.append((candidate, 1.0 if candidate == term else len(prefix) / max(len(candidate), len(term))))
+        return matches
+
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> Tuple[int, List[Tuple[str, float]]]:
+        """Return (total hits, [(rating id, score)]) for one page, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if self.collection is not None:
+            if not self.built:
+                # Nothing to serve yet
+                self._build_once()
+            elif self.stale:
+                self._refresh_in_background()
+        with self._lock:
+            self._stats["searches"] += 1
+            if not terms or not self._doc_terms:
+                return 0, []
+            doc_count = len(self._doc_terms)
+            average_length = self._total_length / doc_count or 1.0
+            scores: Dict[str, float] = {}
+            matched_terms: Dict[str, int] = {}
+            for term in terms:
+                term_scores: Dict[str, float] = {}
+                for indexed, weight in self._expand(term):
+                    postings = self._postings[indexed]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / average_length)
+                        score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                        term_scores[doc_id] = max(term_scores.get(doc_id, 0.0), score)
+                for doc_id, score in term_scores.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+                    matched_terms[doc_id] = matched_terms.get(doc_id, 0) + 1
+
+        # Every query term must match (AND), like a search box is expected to behave
+        hits = [(doc_id, score) for doc_id, score in scores.items() if matched_terms[doc_id] == len(terms)]
+        # Ties go to the newest rating; ObjectIds sort by creation time
+        hits.sort(key=lambda hit: (hit[1], hit[0]), reverse=True)
+        return len(hits), [(doc_id, round(score, 4)) for doc_id, score in hits[skip:skip + limit]]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._doc_terms),
+            "terms": len(self._postings),
+            "stale": self.stale,
+            "refreshing": self._refreshing,
+            **self._stats,
+        }
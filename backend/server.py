@@ -1,40 +1,239 @@
-from fastapi import FastAPI, HTTPException
+import boot_clock  # noqa: F401  (first import: starts the cold-start clock)
+from fastapi import FastAPI, APIRouter, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime, timezone
+from contextlib import asynccontextmanager
 from pymongo import MongoClient
 from bson import ObjectId
 import os
+import re
 import glob
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
 from dotenv import load_dotenv
+from image_processing import ImageProcessor, ImageProcessingBusy, BrokenProcessPool, DecompressionBombError
+import catalog_tiles
+from response_cache import response_cache
+from change_events import ChangeWatcher, CHANGE_WATCHER_ENABLED
+from admission import AdmissionMiddleware, admission_controller
+from resilience import resilience, SPOOL_REPLAY_INTERVAL
+from local_store import LocalClient, SQLITE_PATH
+from search_index import RatingSearchIndex
+from read_routing import ReadRouting
 
 load_dotenv()
 
-app = FastAPI()
-
-# Mount static files for catalog images (accessible via /static/)
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# MongoDB connection
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "inovix_portal")
-client = MongoClient(MONGO_URL)
-db = client[DB_NAME]
-ratings_collection = db["ratings"]
-quiz_scores_collection = db["quiz_scores"]
-quiz_arena_collection = db["quiz_arena"]
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+logger = logging.getLogger(__name__)
+
+class Settings(BaseModel):
+    # "mongo", or "sqlite" for the embedded store used at offline events
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "mongo")
+    sqlite_path: str = SQLITE_PATH
+    mongo_url: str = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+    db_name: str = os.getenv("DB_NAME", "inovix_portal")
+    mongo_max_pool_size: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    mongo_server_selection_timeout_ms: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Read preference for admin lists and stats; submits, search and the leaderboard always read the primary
+    analytics_read_preference: str = os.getenv("ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+    # -1 for no bound; otherwise at least 90 seconds
+    analytics_max_staleness_seconds: int = int(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS", "90"))
+    static_dir: str = os.getenv("STATIC_DIR", os.path.join(BASE_DIR, "static"))
+    # Create indexes and build the search index in the background on startup
+    warm_up: bool = os.getenv("WARM_UP", "1") == "1"
+    # Pre-generate deep-zoom tiles for all catalog pages in the background on startup
+    catalog_tiles_on_startup: bool = os.getenv("CATALOG_TILES_ON_STARTUP", "1") == "1"
+    # Seconds from import until the app accepts requests; exceeding it logs a warning
+    cold_start_target: float = float(os.getenv("COLD_START_TARGET_SECONDS", "2.0"))
+
+    @property
+    def catalog_dir(self) -> str:
+        return os.path.join(self.static_dir, "catalog")
+
+class Database:
+    """Client and collection handles of one app, created lazily by its lifespan"""
+
+    def __init__(self, app_settings: Settings):
+        # No network I/O happens until the first operation
+        if app_settings.storage_backend == "sqlite":
+            self.client = LocalClient(app_settings.sqlite_path)
+        elif app_settings.storage_backend == "mongo":
+            self.client = MongoClient(
+                app_settings.mongo_url,
+                connect=False,
+                maxPoolSize=app_settings.mongo_max_pool_size,
+                serverSelectionTimeoutMS=app_settings.mongo_server_selection_timeout_ms,
+            )
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {app_settings.storage_backend}")
+        self.db = self.client[app_settings.db_name]
+        self.ratings = self.db["ratings"]
+        self.quiz_scores = self.db["quiz_scores"]
+        self.quiz_arena = self.db["quiz_arena"]
+        # Handles for admin lists and stats aggregations
+        self.read_routing = ReadRouting(
+            self.client,
+            [self.ratings, self.quiz_scores, self.quiz_arena],
+            app_settings.analytics_read_preference,
+            app_settings.analytics_max_staleness_seconds,
+        )
+
+    @property
+    def collections(self) -> dict:
+        return {c.name: c for c in (self.ratings, self.quiz_scores, self.quiz_arena)}
+
+    def ensure_indexes(self):
+        """Indexes backing the list sorts, stats counts and leaderboard"""
+        self.ratings.create_index([("timestamp", -1)])
+        self.ratings.create_index([("stars", 1)])
+        # Company-filtered lists and stats
+        self.ratings.create_index([("company", 1), ("timestamp", -1)])
+        self.ratings.create_index([("company", 1), ("stars", 1)])
+        self.quiz_scores.create_index([("timestamp", -1)])
+        self.quiz_scores.create_index([("score", 1)])
+        self.quiz_arena.create_index([("timestamp", -1)])
+        self.quiz_arena.create_index([("correct_answers", -1), ("average_time", 1)])
+
+    def close(self):
+        self.client.close()
+
+def warm_up(app: FastAPI):
+    """Background warm-up; failures only delay readiness, they never stop the app"""
+    state = app.state
+    if state.settings.warm_up:
+        try:
+            state.db.client.admin.command("ping")
+            state.readiness["database"] = True
+            state.db.ensure_indexes()
+            state.readiness["indexes"] = True
+            state.search_index.rebuild(state.db.ratings)
+            state.readiness["search_index"] = True
+        except Exception as e:
+            logger.warning("Database warm-up failed: %s", e)
+    if state.settings.catalog_tiles_on_startup:
+        try:
+            catalog_tiles.generate_all(list_catalog_files(state.settings))
+            state.readiness["catalog_tiles"] = True
+        except Exception as e:
+            logger.warning("Catalog tile warm-up failed: %s", e)
+
+def collection_changed(app: FastAPI, name: str):
+    """Invalidate in-process state derived from a collection after a bulk or replayed write"""
+    response_cache.bump(name)
+    if name == app.state.db.ratings.name:
+        app.state.search_index.mark_stale()
+
+async def replay_spooled_submissions(app: FastAPI):
+    """Periodically insert submissions spooled while Mongo was unavailable"""
+    while True:
+        await asyncio.sleep(SPOOL_REPLAY_INTERVAL)
+        try:
+            await asyncio.to_thread(
+                resilience.replay, app.state.db.collections, lambda name: collection_changed(app, name)
+            )
+        except Exception as e:
+            logger.warning("Replaying spooled submissions failed: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state = app.state
+    state.db = Database(state.settings)
+    # Built by warm-up, or lazily by the first search
+    state.search_index.collection = state.db.ratings
+    state.search_index.mark_stale()
+    state.search_index.subscribe(lambda: response_cache.bump(state.db.ratings.name))
+    if CHANGE_WATCHER_ENABLED:
+        state.change_watcher = ChangeWatcher(list(state.db.collections.values()))
+        state.change_watcher.subscribe(lambda event: response_cache.bump(event["collection"]))
+        state.change_watcher.subscribe(state.search_index.handle_change)
+        state.change_watcher.start()
+    warm_up_task = None
+    if state.settings.warm_up or state.settings.catalog_tiles_on_startup:
+        warm_up_task = asyncio.get_running_loop().run_in_executor(None, warm_up, app)
+    replay_task = asyncio.create_task(replay_spooled_submissions(app))
+
+    state.readiness["cold_start_seconds"] = round(time.perf_counter() - boot_clock.STARTED, 3)
+    if state.readiness["cold_start_seconds"] > state.settings.cold_start_target:
+        logger.warning("Cold start took %ss (target %ss)", state.readiness["cold_start_seconds"], state.settings.cold_start_target)
+    try:
+        yield
+    finally:
+        replay_task.cancel()
+        if state.change_watcher is not None:
+            state.change_watcher.stop()
+        state.image_processor.shutdown()
+        if warm_up_task is not None and not warm_up_task.done():
+            warm_up_task.cancel()
+        state.db.close()
+
+router = APIRouter()
+
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """Build the API app; connections are opened by its lifespan, not here
+
+    Per-app state (settings, database handles, search index, photo
+    processor, readiness) lives on `app.state`. The response cache,
+    resilience and admission services are shared by every app in the process.
+    """
+    app_settings = app_settings or Settings()
+
+    # orjson renders responses several times faster than the stdlib encoder
+    application = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+    application.state.settings = app_settings
+    application.state.db = None  # Database, opened by the lifespan
+    # Writes handled by other workers reach this worker's caches through change streams
+    application.state.change_watcher = None
+    application.state.search_index = RatingSearchIndex()
+    # Re-encodes uploads to a capped-resolution JPEG without EXIF in a process pool
+    application.state.image_processor = ImageProcessor()
+    # Startup progress reported by the readiness endpoint
+    application.state.readiness = {
+        "database": False, "indexes": False, "search_index": False, "catalog_tiles": False, "cold_start_seconds": None
+    }
+
+    # Mount static files for catalog images (accessible via /static/)
+    application.mount("/static", StaticFiles(directory=app_settings.static_dir, check_dir=False), name="static")
+
+    # Load shedding for submit endpoints (added first so CORS headers wrap its 429/503s)
+    application.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+    # CORS middleware
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    application.include_router(router)
+    return application
+
+# Rating photo uploads (multipart path) are stored on disk, not in Mongo
+PHOTO_UPLOAD_DIR = os.getenv("PHOTO_UPLOAD_DIR", os.path.join(BASE_DIR, "uploads", "ratings"))
+PHOTO_URL_PREFIX = "/api/ratings/photos/"
+MAX_PHOTO_BYTES = int(os.getenv("MAX_PHOTO_BYTES", str(10 * 1024 * 1024)))
+PHOTO_CHUNK_SIZE = 64 * 1024
+# Multipart bodies may exceed the photo by this much (boundaries, part headers, text fields)
+MAX_UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Re-encode uploads to a capped-resolution JPEG without EXIF in a process pool
+IMAGE_PROCESSING_ENABLED = os.getenv("IMAGE_PROCESSING_ENABLED", "1") == "1"
+
+# Magic-byte signatures of accepted photo formats -> file extension
+PHOTO_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"RIFF", "webp"),  # confirmed by the WEBP marker at offset 8
+]
 
 # Models
 class RatingSubmission(BaseModel):
@@ -56,12 +255,211 @@ class QuizScore(BaseModel):
     total_questions: int
     correct_answers: int
 
-@app.get("/api/health")
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    timestamp_from: Optional[str] = None  # ISO date or timestamp, inclusive
+    timestamp_to: Optional[str] = None  # ISO date or timestamp, inclusive (a date covers the whole day)
+    company: Optional[str] = None  # ratings only
+    name_prefix: Optional[str] = None  # quiz arena only
+
+# Maximum number of IDs sent to Mongo in a single delete_many call
+BULK_DELETE_CHUNK_SIZE = int(os.getenv("BULK_DELETE_CHUNK_SIZE", "1000"))
+
+def parse_object_ids(ids: List[str]) -> List[ObjectId]:
+    """Parse a list of string IDs, rejecting the whole request on any invalid one"""
+    invalid = [i for i in ids if not ObjectId.is_valid(i)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid IDs: {', '.join(invalid[:10])}")
+    # Deduplicate while keeping order so counts match what was requested
+    return list(dict.fromkeys(ObjectId(i) for i in ids))
+
+def parse_timestamp(value: str, name: str, end_of_day: bool = False) -> str:
+    """Normalize an ISO date or timestamp to the stored format (naive UTC isoformat)
+
+    Stored timestamps are compared as strings, so bounds must be in the
+    same format; anything that does not parse is rejected with a 400.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 date or timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    elif end_of_day:
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            pass
+        else:
+            # A date-only upper bound includes the whole day
+            parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed.isoformat()
+
+def timestamp_range(timestamp_from: Optional[str], timestamp_to: Optional[str]) -> dict:
+    """Filter on the ISO `timestamp` field, both bounds inclusive; empty if neither is given"""
+    bounds = {}
+    if timestamp_from:
+        bounds["$gte"] = parse_timestamp(timestamp_from, "timestamp_from")
+    if timestamp_to:
+        bounds["$lte"] = parse_timestamp(timestamp_to, "timestamp_to", end_of_day=True)
+    return {"timestamp": bounds} if bounds else {}
+
+def rating_filter(company: Optional[str], timestamp_from: Optional[str], timestamp_to: Optional[str]) -> dict:
+    """Query-param filter shared by the rating list and stats endpoints"""
+    query = timestamp_range(timestamp_from, timestamp_to)
+    if company is not None:
+        query["company"] = company
+    return query
+
+def build_bulk_filter(request: BulkDeleteRequest, allowed_fields: set) -> dict:
+    """Build a Mongo filter from the non-ID criteria of a bulk delete request"""
+    query = timestamp_range(request.timestamp_from, request.timestamp_to)
+    if request.company is not None:
+        if "company" not in allowed_fields:
+            raise HTTPException(status_code=400, detail="Filter 'company' is not supported here")
+        query["company"] = request.company
+    if request.name_prefix:
+        if "name" not in allowed_fields:
+            raise HTTPException(status_code=400, detail="Filter 'name_prefix' is not supported here")
+        query["name"] = {"$regex": f"^{re.escape(request.name_prefix)}"}
+    return query
+
+def bulk_delete(app: FastAPI, collection, request: BulkDeleteRequest, allowed_fields: set, photo_field: Optional[str] = None) -> dict:
+    """Delete documents by ID list and/or filter using chunked delete_many calls"""
+    query = build_bulk_filter(request, allowed_fields)
+    if not request.ids and not query:
+        # Refuse an empty request so it can never act as an accidental "delete all"
+        raise HTTPException(status_code=400, detail="Provide 'ids' or at least one filter")
+
+    # Deleted ratings leave the search index before the cache is bumped, so the
+    # next (cached) search cannot be answered from the old index
+    search_index = app.state.search_index if collection.name == app.state.db.ratings.name else None
+
+    def delete_matching(chunk_query: dict) -> int:
+        # Collect stored photo files and indexed IDs first so they can be removed with their documents
+        photos = []
+        if photo_field:
+            photos = [doc.get(photo_field, "") for doc in collection.find(
+                {**chunk_query, photo_field: {"$regex": f"^{re.escape(PHOTO_URL_PREFIX)}"}},
+                {photo_field: 1}
+            )]
+        doc_ids = [doc["_id"] for doc in collection.find(chunk_query, {"_id": 1})] if search_index else []
+        result = collection.delete_many(chunk_query)
+        for photo in photos:
+            delete_photo_file(photo)
+        for doc_id in doc_ids:
+            search_index.remove(doc_id)
+        return result.deleted_count
+
+    if not request.ids:
+        deleted_count = delete_matching(query)
+        collection_changed(app, collection.name)
+        return {"success": True, "deleted_count": deleted_count, "requested": None}
+
+    object_ids = parse_object_ids(request.ids)
+    deleted_count = 0
+    try:
+        for start in range(0, len(object_ids), BULK_DELETE_CHUNK_SIZE):
+            chunk = object_ids[start:start + BULK_DELETE_CHUNK_SIZE]
+            deleted_count += delete_matching({**query, "_id": {"$in": chunk}})
+    finally:
+        # Earlier chunks may have been deleted even if a later one failed
+        collection_changed(app, collection.name)
+    return {
+        "success": True,
+        "deleted_count": deleted_count,
+        "requested": len(object_ids),
+        "not_found": len(object_ids) - deleted_count,
+    }
+
+# Projections that shape list documents inside Mongo, so list endpoints can
+# return them as-is without per-row models, str(ObjectId) or round() calls
+RATING_LIST_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "stars": 1,
+    "comment": {"$ifNull": ["$comment", ""]},
+    "photo": {"$ifNull": ["$photo", ""]},
+    "company": {"$ifNull": ["$company", ""]},
+    "timestamp": 1,
+}
+# Search hits leave out photos, which may be inline base64 data
+RATING_SEARCH_PROJECTION = {k: v for k, v in RATING_LIST_PROJECTION.items() if k != "photo"}
+SEARCH_MAX_PAGE_SIZE = 100
+QUIZ_SCORE_LIST_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "score": 1,
+    "total_questions": {"$ifNull": ["$total_questions", 10]},
+    "correct_answers": {"$ifNull": ["$correct_answers", 0]},
+    "timestamp": 1,
+}
+QUIZ_ARENA_LIST_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "name": 1,
+    "correct_answers": 1,
+    "total_questions": {"$ifNull": ["$total_questions", 15]},
+    "average_time": {"$round": ["$average_time", 2]},
+    "instagram": {"$ifNull": ["$instagram", ""]},
+    "timestamp": 1,
+}
+
+def find_projected(collection, projection: dict, sort: dict, limit: int = 0, query: Optional[dict] = None) -> list:
+    """Run a sorted find as an aggregation that returns response-ready dicts"""
+    pipeline = [{"$match": query}] if query else []
+    pipeline.append({"$sort": sort})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": projection})
+    return list(collection.aggregate(pipeline))
+
+def reads_secondaries(request: Request) -> bool:
+    """Cache bypass for routed endpoints: a lagging secondary could re-cache data a write just changed"""
+    return request.app.state.db.read_routing.may_read_secondaries
+
+@router.get("/api/health")
 async def health_check():
     return {"status": "ok", "message": "INOVIX Portal API is running"}
 
-@app.post("/api/ratings")
-async def submit_rating(rating: RatingSubmission):
+@router.get("/api/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@router.get("/api/health/ready")
+async def readiness_check(request: Request):
+    """Readiness: the database answers and startup warm-up has finished"""
+    state = request.app.state
+    readiness = state.readiness
+    try:
+        await asyncio.to_thread(state.db.client.admin.command, "ping")
+        readiness["database"] = True
+    except Exception:
+        readiness["database"] = False
+    ready = readiness["database"] and (readiness["indexes"] or not state.settings.warm_up)
+    return ORJSONResponse(
+        {"status": "ready" if ready else "starting", **readiness, "cold_start_target": state.settings.cold_start_target},
+        status_code=200 if ready else 503
+    )
+
+@router.get("/api/metrics")
+async def get_metrics(request: Request):
+    """Runtime metrics for background services"""
+    state = request.app.state
+    return {
+        "image_processing": state.image_processor.stats(),
+        "response_cache": response_cache.stats(),
+        "change_watcher": state.change_watcher.stats() if state.change_watcher else None,
+        "admission": admission_controller.stats(),
+        "resilience": resilience.stats(),
+        "search_index": state.search_index.stats(),
+        "read_routing": state.db.read_routing.stats() if state.db else None,
+        "cold_start_seconds": state.readiness["cold_start_seconds"]
+    }
+
+@router.post("/api/ratings")
+async def submit_rating(rating: RatingSubmission, request: Request):
+    state = request.app.state
     try:
         # Validate stars
         if rating.stars < 1 or rating.stars > 5:
@@ -76,66 +474,268 @@ async def submit_rating(rating: RatingSubmission):
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Insert into database
-        result = ratings_collection.insert_one(rating_doc)
+        # Insert into database (spooled locally while Mongo is unavailable)
+        rating_id, queued = resilience.insert(state.db.ratings, rating_doc)
+        if not queued:
+            response_cache.bump("ratings")
+            state.search_index.add({**rating_doc, "_id": rating_id})
         
         return {
             "success": True,
             "message": "Rating submitted successfully",
-            "id": str(result.inserted_id)
+            "id": rating_id,
+            "queued": queued
         }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting rating: {str(e)}")
 
-@app.get("/api/ratings", response_model=List[RatingResponse])
-async def get_ratings():
+def detect_photo_type(head: bytes) -> Optional[str]:
+    """Return the file extension for an accepted image signature, or None"""
+    for signature, extension in PHOTO_SIGNATURES:
+        if head.startswith(signature):
+            if extension == "webp" and head[8:12] != b"WEBP":
+                return None
+            return extension
+    return None
+
+async def store_photo_upload(upload, image_processor: ImageProcessor) -> str:
+    """Copy an uploaded photo to PHOTO_UPLOAD_DIR in chunks and return its URL path"""
+    os.makedirs(PHOTO_UPLOAD_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PHOTO_UPLOAD_DIR, suffix=".part")
     try:
-        ratings = list(ratings_collection.find().sort("timestamp", -1))
-        
-        return [
-            RatingResponse(
-                id=str(rating["_id"]),
-                stars=rating["stars"],
-                comment=rating.get("comment", ""),
-                photo=rating.get("photo", ""),
-                company=rating.get("company", ""),
-                timestamp=rating["timestamp"]
-            )
-            for rating in ratings
-        ]
+        extension = None
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(PHOTO_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if extension is None:
+                    extension = detect_photo_type(chunk)
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Photo must be a JPEG, PNG or WebP image")
+                size += len(chunk)
+                if size > MAX_PHOTO_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Photo exceeds {MAX_PHOTO_BYTES} bytes")
+                out.write(chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Photo is empty")
+
+        if not IMAGE_PROCESSING_ENABLED:
+            filename = f"{uuid.uuid4().hex}.{extension}"
+            os.replace(tmp_path, os.path.join(PHOTO_UPLOAD_DIR, filename))
+            return PHOTO_URL_PREFIX + filename
+
+        filename = f"{uuid.uuid4().hex}.jpg"
+        dest_path = os.path.join(PHOTO_UPLOAD_DIR, filename)
+        try:
+            await image_processor.normalize(tmp_path, dest_path)
+        except ImageProcessingBusy:
+            raise HTTPException(status_code=503, detail="Photo processing is busy, try again", headers={"Retry-After": "2"})
+        except BrokenProcessPool:
+            # The pool is replaced on the next upload
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise HTTPException(status_code=503, detail="Photo processing failed, try again", headers={"Retry-After": "2"})
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Photo processing timed out")
+        except DecompressionBombError:
+            raise HTTPException(status_code=413, detail="Photo resolution is too large")
+        except (OSError, ValueError):
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise HTTPException(status_code=415, detail="Photo could not be decoded")
+        os.remove(tmp_path)
+        return PHOTO_URL_PREFIX + filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        await upload.close()
+
+class UploadTooLarge(MultiPartException):
+    pass
+
+async def limited_body(request: Request, limit: int):
+    """Yield the request body, failing as soon as more than `limit` bytes have arrived"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise UploadTooLarge(f"Photo exceeds {MAX_PHOTO_BYTES} bytes")
+        yield chunk
+
+async def parse_upload_form(request: Request) -> FormData:
+    """Parse a multipart rating upload, counting body bytes as they arrive
+
+    A Content-Length over the limit is refused before reading anything;
+    chunked bodies, or ones that lie about their length, are cut off once
+    the limit is passed instead of being spooled to disk in full.
+    """
+    limit = MAX_PHOTO_BYTES + MAX_UPLOAD_FORM_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        if not content_length.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if int(content_length) > limit:
+            raise HTTPException(status_code=413, detail=f"Photo exceeds {MAX_PHOTO_BYTES} bytes")
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    parser = MultiPartParser(request.headers, limited_body(request, limit), max_files=1, max_fields=10)
+    try:
+        # The parser closes its spooled files when it fails
+        return await parser.parse()
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=e.message)
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+def delete_photo_file(photo: str):
+    """Remove a stored photo file referenced by a rating, ignoring inline base64 photos"""
+    if photo and photo.startswith(PHOTO_URL_PREFIX):
+        path = os.path.join(PHOTO_UPLOAD_DIR, os.path.basename(photo))
+        if os.path.exists(path):
+            os.remove(path)
+
+@router.post("/api/ratings/upload")
+async def submit_rating_upload(request: Request):
+    """Submit a rating as multipart/form-data with the photo streamed to disk"""
+    state = request.app.state
+    try:
+        form = await parse_upload_form(request)
+        try:
+            stars = int(form.get("stars", 0))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Stars must be between 1 and 5")
+        if stars < 1 or stars > 5:
+            raise HTTPException(status_code=400, detail="Stars must be between 1 and 5")
+
+        photo = form.get("photo")
+        photo_url = ""
+        if photo is not None and not isinstance(photo, str):
+            photo_url = await store_photo_upload(photo, state.image_processor)
+
+        rating_doc = {
+            "stars": stars,
+            "comment": form.get("comment") or "",
+            "photo": photo_url,
+            "company": form.get("company") or "",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+        try:
+            rating_id, queued = resilience.insert(state.db.ratings, rating_doc)
+        except Exception:
+            delete_photo_file(photo_url)
+            raise
+        if not queued:
+            response_cache.bump("ratings")
+            state.search_index.add({**rating_doc, "_id": rating_id})
+
+        return {
+            "success": True,
+            "message": "Rating submitted successfully",
+            "id": rating_id,
+            "queued": queued,
+            "photo": photo_url
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting rating: {str(e)}")
+
+@router.get("/api/ratings/photos/{filename}")
+async def serve_rating_photo(filename: str):
+    """Serve a rating photo uploaded via the multipart endpoint"""
+    file_path = os.path.join(PHOTO_UPLOAD_DIR, os.path.basename(filename))
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return FileResponse(file_path)
+
+@router.get("/api/ratings", response_model=List[RatingResponse])
+@response_cache.cached("ratings", bypass=reads_secondaries)
+@resilience.read()
+async def get_ratings(request: Request, company: Optional[str] = None, timestamp_from: Optional[str] = None, timestamp_to: Optional[str] = None):
+    query = rating_filter(company, timestamp_from, timestamp_to)
+    try:
+        db = request.app.state.db
+        ratings = find_projected(db.read_routing.analytics(db.ratings), RATING_LIST_PROJECTION, {"timestamp": -1}, query=query)
+        # Returning the response directly skips re-validation against response_model
+        return ORJSONResponse(ratings)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching ratings: {str(e)}")
 
-@app.get("/api/static/catalog/{filename}")
-async def serve_catalog_image(filename: str):
+@router.get("/api/ratings/search")
+@response_cache.cached("ratings")
+@resilience.read()
+async def search_ratings(request: Request, q: str, page: int = 1, page_size: int = 20):
+    """Ranked full-text search over rating comments and companies"""
+    if page < 1 or not 1 <= page_size <= SEARCH_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"page must be >= 1 and page_size between 1 and {SEARCH_MAX_PAGE_SIZE}")
+    try:
+        state = request.app.state
+        # The first search may have to build the index; keep that off the event loop
+        total, hits = await asyncio.to_thread(state.search_index.search, q, (page - 1) * page_size, page_size)
+        docs = {}
+        if hits:
+            pipeline = [
+                {"$match": {"_id": {"$in": [ObjectId(doc_id) for doc_id, _ in hits]}}},
+                {"$project": RATING_SEARCH_PROJECTION}
+            ]
+            docs = {doc["id"]: doc for doc in state.db.ratings.aggregate(pipeline)}
+        return {
+            "query": q,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            # Keep the index's ranking; hits deleted since they were indexed drop out
+            "results": [{**docs[doc_id], "score": score} for doc_id, score in hits if doc_id in docs]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching ratings: {str(e)}")
+
+@router.get("/api/static/catalog/{filename}")
+async def serve_catalog_image(filename: str, request: Request):
     """Serve catalog images under /api/static/ path"""
-    file_path = f"static/catalog/{filename}"
+    file_path = os.path.join(request.app.state.settings.catalog_dir, os.path.basename(filename))
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Image not found")
     return FileResponse(file_path)
 
-@app.get("/api/catalog/images")
-async def get_catalog_images():
+
+def list_catalog_files(app_settings: Settings) -> List[str]:
+    """Catalog image paths in display order (numbered prefix ensures order)"""
+    if not os.path.exists(app_settings.catalog_dir):
+        return []
+    return sorted(
+        glob.glob(os.path.join(app_settings.catalog_dir, "*.png")) +
+        glob.glob(os.path.join(app_settings.catalog_dir, "*.jpg"))
+    )
+
+def get_catalog_file(app_settings: Settings, image_id: int) -> str:
+    """Resolve a 1-based catalog image ID to its file path"""
+    image_files = list_catalog_files(app_settings)
+    if image_id < 1 or image_id > len(image_files):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_files[image_id - 1]
+
+@router.get("/api/catalog/images")
+async def get_catalog_images(request: Request):
     """Get list of catalog images in order"""
     try:
-        catalog_dir = "static/catalog"
-        if not os.path.exists(catalog_dir):
-            return {"images": [], "total": 0}
-        
-        # Get all image files (PNG and JPG) and sort them by filename (numbered prefix ensures order)
-        image_files = sorted(
-            glob.glob(os.path.join(catalog_dir, "*.png")) + 
-            glob.glob(os.path.join(catalog_dir, "*.jpg"))
-        )
+        image_files = list_catalog_files(request.app.state.settings)
         
         # Create URLs for each image
         images = [
             {
                 "id": idx + 1,
                 "filename": os.path.basename(f),
-                "url": f"/static/catalog/{os.path.basename(f)}"
+                "url": f"/static/catalog/{os.path.basename(f)}",
+                "tiles_url": f"/api/catalog/{idx + 1}/tiles"
             }
             for idx, f in enumerate(image_files)
         ]
@@ -147,32 +747,96 @@ async def get_catalog_images():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching catalog images: {str(e)}")
 
-@app.delete("/api/ratings/{rating_id}")
-async def delete_rating(rating_id: str):
+@router.get("/api/catalog/{image_id}/tiles")
+async def get_catalog_tiles_info(image_id: int, request: Request):
+    """Deep-zoom descriptor (size, tile size, overlap, levels) for a catalog image"""
+    try:
+        source_path = get_catalog_file(request.app.state.settings, image_id)
+        manifest = await asyncio.to_thread(catalog_tiles.ensure_tiles, source_path)
+        return {
+            "id": image_id,
+            **manifest,
+            "tile_url_template": f"/api/catalog/{image_id}/tiles/{{level}}/{{x}}_{{y}}"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating catalog tiles: {str(e)}")
+
+@router.get("/api/catalog/{image_id}/tiles/{level}/{x}_{y}")
+async def get_catalog_tile(image_id: int, level: int, x: int, y: int, request: Request):
+    """Serve a single deep-zoom tile of a catalog image"""
+    try:
+        source_path = get_catalog_file(request.app.state.settings, image_id)
+        manifest = await asyncio.to_thread(catalog_tiles.ensure_tiles, source_path)
+        if level < 0 or level > manifest["max_level"]:
+            raise HTTPException(status_code=404, detail="Tile not found")
+        file_path = catalog_tiles.tile_path(source_path, level, x, y)
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="Tile not found")
+        return FileResponse(
+            file_path,
+            media_type="image/jpeg",
+            headers={"Cache-Control": "public, max-age=86400", "ETag": f'"{manifest["sha256"][:16]}-{level}-{x}-{y}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error serving catalog tile: {str(e)}")
+
+@router.delete("/api/ratings/{rating_id}")
+async def delete_rating(rating_id: str, request: Request):
     """Delete a specific rating"""
+    state = request.app.state
     try:
-        result = ratings_collection.delete_one({"_id": ObjectId(rating_id)})
-        if result.deleted_count == 0:
+        deleted = state.db.ratings.find_one_and_delete({"_id": ObjectId(rating_id)}, {"photo": 1})
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Rating not found")
+        response_cache.bump("ratings")
+        state.search_index.remove(rating_id)
+        delete_photo_file(deleted.get("photo", ""))
         return {"success": True, "message": "Rating deleted"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting rating: {str(e)}")
 
-@app.delete("/api/ratings")
-async def delete_all_ratings():
+@router.delete("/api/ratings")
+async def delete_all_ratings(request: Request):
     """Delete all ratings"""
+    state = request.app.state
     try:
-        result = ratings_collection.delete_many({})
+        result = state.db.ratings.delete_many({})
+        response_cache.bump("ratings")
+        state.search_index.clear()
+        if os.path.isdir(PHOTO_UPLOAD_DIR):
+            for path in glob.glob(os.path.join(PHOTO_UPLOAD_DIR, "*")):
+                # .part files belong to uploads still being written or normalized
+                if not path.endswith(".part"):
+                    os.remove(path)
         return {"success": True, "deleted_count": result.deleted_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting ratings: {str(e)}")
 
-@app.get("/api/ratings/stats")
-async def get_rating_stats():
+@router.post("/api/ratings/bulk-delete")
+async def bulk_delete_ratings(criteria: BulkDeleteRequest, request: Request):
+    """Delete ratings by ID list and/or timestamp range and company"""
+    try:
+        return bulk_delete(request.app, request.app.state.db.ratings, criteria, {"company"}, photo_field="photo")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error bulk deleting ratings: {str(e)}")
+
+@router.get("/api/ratings/stats")
+@response_cache.cached("ratings", bypass=reads_secondaries)
+@resilience.read("rating_stats")
+async def get_rating_stats(request: Request, company: Optional[str] = None, timestamp_from: Optional[str] = None, timestamp_to: Optional[str] = None):
+    query = rating_filter(company, timestamp_from, timestamp_to)
     try:
-        total_ratings = ratings_collection.count_documents({})
+        db = request.app.state.db
+        collection = db.read_routing.analytics(db.ratings)
+        total_ratings = collection.count_documents(query)
         
         if total_ratings == 0:
             return {
@@ -183,15 +847,16 @@ async def get_rating_stats():
         
         # Calculate average
         pipeline = [
+            {"$match": query},
             {"$group": {"_id": None, "avg_stars": {"$avg": "$stars"}}}
         ]
-        avg_result = list(ratings_collection.aggregate(pipeline))
+        avg_result = list(collection.aggregate(pipeline))
         avg_stars = avg_result[0]["avg_stars"] if avg_result else 0
         
         # Star distribution
         star_distribution = {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
         for i in range(1, 6):
-            count = ratings_collection.count_documents({"stars": i})
+            count = collection.count_documents({**query, "stars": i})
             star_distribution[str(i)] = count
         
         return {
@@ -202,9 +867,55 @@ async def get_rating_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
 
-@app.post("/api/quiz/submit")
-async def submit_quiz_score(quiz_data: QuizScore):
+@router.get("/api/ratings/companies")
+@response_cache.cached("ratings", bypass=reads_secondaries)
+@resilience.read("company_breakdown")
+async def get_company_breakdown(request: Request, timestamp_from: Optional[str] = None, timestamp_to: Optional[str] = None):
+    """Per-company rating count, average and star distribution from a single grouped aggregation"""
+    match = timestamp_range(timestamp_from, timestamp_to)
+    try:
+        db = request.app.state.db
+        # Counts per (company, stars) pair: plain GROUP BY columns on SQLite, and at
+        # most five rows per company to fold here
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": {"company": "$company", "stars": "$stars"}, "count": {"$sum": 1}}}
+        ]
+        companies = {}
+        for row in db.read_routing.analytics(db.ratings).aggregate(pipeline):
+            company, stars, count = row["_id"].get("company"), row["_id"].get("stars"), row["count"]
+            entry = companies.setdefault(company, {
+                "company": company,
+                "total_ratings": 0,
+                "star_sum": 0,
+                "rated": 0,
+                "star_distribution": {str(i): 0 for i in range(1, 6)}
+            })
+            entry["total_ratings"] += count
+            if isinstance(stars, (int, float)):
+                entry["star_sum"] += stars * count
+                entry["rated"] += count
+            if str(stars) in entry["star_distribution"]:
+                entry["star_distribution"][str(stars)] += count
+        breakdown = [
+            {
+                "company": entry["company"],
+                "total_ratings": entry["total_ratings"],
+                "average_stars": round(entry["star_sum"] / entry["rated"], 2) if entry["rated"] else 0,
+                "star_distribution": entry["star_distribution"]
+            }
+            for entry in companies.values()
+        ]
+        # Most rated first, then by name (a missing company sorts first, as in Mongo)
+        breakdown.sort(key=lambda c: (-c["total_ratings"], c["company"] is not None, c["company"] or ""))
+        return breakdown
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching company breakdown: {str(e)}")
+
+@router.post("/api/quiz/submit")
+async def submit_quiz_score(quiz_data: QuizScore, request: Request):
     """Submit quiz score"""
+    quiz_scores_collection = request.app.state.db.quiz_scores
     try:
         score_doc = {
             "score": quiz_data.score,
@@ -213,7 +924,11 @@ async def submit_quiz_score(quiz_data: QuizScore):
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        result = quiz_scores_collection.insert_one(score_doc)
+        score_id, queued = resilience.insert(quiz_scores_collection, score_doc)
+        if queued:
+            # No percentile without the database; 0 hides it in the quiz screen
+            return {"success": True, "id": score_id, "percentile": 0, "queued": True}
+        response_cache.bump("quiz_scores")
         
         # Calculate percentile
         total_scores = quiz_scores_collection.count_documents({})
@@ -222,56 +937,64 @@ async def submit_quiz_score(quiz_data: QuizScore):
         
         return {
             "success": True,
-            "id": str(result.inserted_id),
+            "id": score_id,
             "percentile": round(percentile, 1)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting quiz score: {str(e)}")
 
-@app.get("/api/quiz/scores")
-async def get_quiz_scores():
+@router.get("/api/quiz/scores")
+@response_cache.cached("quiz_scores", bypass=reads_secondaries)
+@resilience.read()
+async def get_quiz_scores(request: Request):
     """Get all quiz scores"""
     try:
-        scores = list(quiz_scores_collection.find().sort("timestamp", -1))
-        
-        return [
-            {
-                "id": str(score["_id"]),
-                "score": score["score"],
-                "total_questions": score.get("total_questions", 10),
-                "correct_answers": score.get("correct_answers", 0),
-                "timestamp": score["timestamp"]
-            }
-            for score in scores
-        ]
+        db = request.app.state.db
+        return ORJSONResponse(find_projected(db.read_routing.analytics(db.quiz_scores), QUIZ_SCORE_LIST_PROJECTION, {"timestamp": -1}))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching quiz scores: {str(e)}")
 
-@app.delete("/api/quiz/scores/{score_id}")
-async def delete_quiz_score(score_id: str):
+@router.delete("/api/quiz/scores/{score_id}")
+async def delete_quiz_score(score_id: str, request: Request):
     """Delete a specific quiz score"""
     try:
-        result = quiz_scores_collection.delete_one({"_id": ObjectId(score_id)})
+        result = request.app.state.db.quiz_scores.delete_one({"_id": ObjectId(score_id)})
+        response_cache.bump("quiz_scores")
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Quiz score not found")
         return {"success": True, "message": "Quiz score deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting quiz score: {str(e)}")
 
-@app.delete("/api/quiz/scores")
-async def delete_all_quiz_scores():
+@router.delete("/api/quiz/scores")
+async def delete_all_quiz_scores(request: Request):
     """Delete all quiz scores"""
     try:
-        result = quiz_scores_collection.delete_many({})
+        result = request.app.state.db.quiz_scores.delete_many({})
+        response_cache.bump("quiz_scores")
         return {"success": True, "deleted_count": result.deleted_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting quiz scores: {str(e)}")
 
-@app.get("/api/quiz/stats")
-async def get_quiz_stats():
+@router.post("/api/quiz/scores/bulk-delete")
+async def bulk_delete_quiz_scores(criteria: BulkDeleteRequest, request: Request):
+    """Delete quiz scores by ID list and/or timestamp range"""
+    try:
+        return bulk_delete(request.app, request.app.state.db.quiz_scores, criteria, set())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error bulk deleting quiz scores: {str(e)}")
+
+@router.get("/api/quiz/stats")
+@response_cache.cached("quiz_scores", bypass=reads_secondaries)
+@resilience.read("quiz_stats")
+async def get_quiz_stats(request: Request):
     """Get quiz statistics"""
     try:
-        total_attempts = quiz_scores_collection.count_documents({})
+        db = request.app.state.db
+        collection = db.read_routing.analytics(db.quiz_scores)
+        total_attempts = collection.count_documents({})
         
         if total_attempts == 0:
             return {
@@ -284,7 +1007,7 @@ async def get_quiz_stats():
         pipeline = [
             {"$group": {"_id": None, "avg_score": {"$avg": "$score"}, "max_score": {"$max": "$score"}}}
         ]
-        result = list(quiz_scores_collection.aggregate(pipeline))
+        result = list(collection.aggregate(pipeline))
         
         avg_score = result[0]["avg_score"] if result else 0
         max_score = result[0]["max_score"] if result else 0
@@ -305,8 +1028,8 @@ class QuizArenaSubmission(BaseModel):
     average_time: float  # in seconds
     instagram: str = ""  # Optional Instagram handle
 
-@app.post("/api/quiz-arena/submit")
-async def submit_quiz_arena(data: QuizArenaSubmission):
+@router.post("/api/quiz-arena/submit")
+async def submit_quiz_arena(data: QuizArenaSubmission, request: Request):
     """Submit Quiz Arena score with name and optional Instagram"""
     try:
         score_doc = {
@@ -318,47 +1041,38 @@ async def submit_quiz_arena(data: QuizArenaSubmission):
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        result = quiz_arena_collection.insert_one(score_doc)
+        score_id, queued = resilience.insert(request.app.state.db.quiz_arena, score_doc)
+        if not queued:
+            response_cache.bump("quiz_arena")
         
         return {
             "success": True,
-            "id": str(result.inserted_id)
+            "id": score_id,
+            "queued": queued
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting quiz arena score: {str(e)}")
 
-@app.get("/api/quiz-arena/all")
-async def get_all_quiz_arena_results():
+@router.get("/api/quiz-arena/all")
+@response_cache.cached("quiz_arena", bypass=reads_secondaries)
+@resilience.read()
+async def get_all_quiz_arena_results(request: Request):
     """Get ALL quiz arena results for admin panel"""
     try:
-        scores = list(
-            quiz_arena_collection
-            .find()
-            .sort("timestamp", -1)
-        )
-        
-        return [
-            {
-                "_id": str(score["_id"]),
-                "name": score["name"],
-                "correct_answers": score["correct_answers"],
-                "total_questions": score.get("total_questions", 15),
-                "average_time": round(score["average_time"], 2),
-                "instagram": score.get("instagram", ""),
-                "timestamp": score["timestamp"]
-            }
-            for score in scores
-        ]
+        db = request.app.state.db
+        return ORJSONResponse(find_projected(db.read_routing.analytics(db.quiz_arena), QUIZ_ARENA_LIST_PROJECTION, {"timestamp": -1}))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching all quiz arena results: {str(e)}")
 
-@app.get("/api/quiz-arena/leaderboard")
-async def get_leaderboard():
+@router.get("/api/quiz-arena/leaderboard")
+@response_cache.cached("quiz_arena")
+@resilience.read("leaderboard")
+async def get_leaderboard(request: Request):
     """Get Top 10 leaderboard - sorted by correct answers DESC, then by average time ASC"""
     try:
         # Get top 10 sorted by correct_answers (desc), then average_time (asc)
         scores = list(
-            quiz_arena_collection
+            request.app.state.db.quiz_arena
             .find()
             .sort([("correct_answers", -1), ("average_time", 1)])
             .limit(10)
@@ -378,11 +1092,15 @@ async def get_leaderboard():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching leaderboard: {str(e)}")
 
-@app.get("/api/quiz-arena/stats")
-async def get_arena_stats():
+@router.get("/api/quiz-arena/stats")
+@response_cache.cached("quiz_arena", bypass=reads_secondaries)
+@resilience.read("arena_stats")
+async def get_arena_stats(request: Request):
     """Get statistics for comparison"""
     try:
-        total_attempts = quiz_arena_collection.count_documents({})
+        db = request.app.state.db
+        collection = db.read_routing.analytics(db.quiz_arena)
+        total_attempts = collection.count_documents({})
         
         if total_attempts == 0:
             return {
@@ -392,7 +1110,7 @@ async def get_arena_stats():
             }
         
         # Get all average times and calculate median
-        all_times = [doc["average_time"] for doc in quiz_arena_collection.find({}, {"average_time": 1})]
+        all_times = [doc["average_time"] for doc in collection.find({}, {"average_time": 1})]
         all_times.sort()
         median_time = all_times[len(all_times) // 2] if all_times else 0
         
@@ -416,7 +1134,7 @@ async def get_arena_stats():
             }
         ]
         
-        result = list(quiz_arena_collection.aggregate(pipeline))
+        result = list(collection.aggregate(pipeline))
         avg_success_rate = result[0]["avg_success_rate"] if result else 0
         
         return {
@@ -428,12 +1146,13 @@ async def get_arena_stats():
         raise HTTPException(status_code=500, detail=f"Error fetching arena stats: {str(e)}")
 
 
-@app.delete("/api/quiz-arena/{score_id}")
-async def delete_quiz_arena_score(score_id: str):
+@router.delete("/api/quiz-arena/{score_id}")
+async def delete_quiz_arena_score(score_id: str, request: Request):
     """Delete a single quiz arena score by ID"""
     try:
         from bson import ObjectId
-        result = quiz_arena_collection.delete_one({"_id": ObjectId(score_id)})
+        result = request.app.state.db.quiz_arena.delete_one({"_id": ObjectId(score_id)})
+        response_cache.bump("quiz_arena")
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Score not found")
@@ -444,17 +1163,30 @@ async def delete_quiz_arena_score(score_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting quiz arena score: {str(e)}")
 
-@app.delete("/api/quiz-arena")
-async def delete_all_quiz_arena_scores():
+@router.post("/api/quiz-arena/bulk-delete")
+async def bulk_delete_quiz_arena_scores(criteria: BulkDeleteRequest, request: Request):
+    """Delete quiz arena scores by ID list and/or timestamp range and name prefix"""
+    try:
+        return bulk_delete(request.app, request.app.state.db.quiz_arena, criteria, {"name"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error bulk deleting quiz arena scores: {str(e)}")
+
+@router.delete("/api/quiz-arena")
+async def delete_all_quiz_arena_scores(request: Request):
     """Delete all quiz arena scores"""
     try:
-        result = quiz_arena_collection.delete_many({})
+        result = request.app.state.db.quiz_arena.delete_many({})
+        response_cache.bump("quiz_arena")
         return {"success": True, "deleted": result.deleted_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting all quiz arena scores: {str(e)}")
 
 
 
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -4,6 +4,7 @@ Backend API Testing for INOVIX Customer Portal - Admin Panel Deletion Endpoints
 Tests all deletion endpoints as requested by user for admin panel functionality.
 """
 
+import base64
 import requests
 import json
 import time
@@ -338,6 +339,175 @@ def test_delete_all_ratings():
         log_test("DELETE /api/ratings", "FAIL", f"Error: {str(e)}")
         return False
 
+def test_bulk_delete_ratings():
+    """Test POST /api/ratings/bulk-delete with an ID list and a company filter"""
+    try:
+        ids = [create_test_rating(comment=f"Bulk delete test {i}", company="Bulk Test Company") for i in range(3)]
+        ids = [i for i in ids if i]
+        if len(ids) != 3:
+            log_test("POST /api/ratings/bulk-delete", "FAIL", "Could not create test ratings")
+            return False
+        
+        # Delete two by ID (plus one non-existent) and the rest by company filter
+        fake_id = "507f1f77bcf86cd799439011"
+        response = requests.post(f"{BACKEND_URL}/ratings/bulk-delete", json={"ids": ids[:2] + [fake_id]}, timeout=10)
+        data = response.json()
+        if response.status_code != 200 or data.get("deleted_count") != 2 or data.get("not_found") != 1:
+            log_test("POST /api/ratings/bulk-delete (ids)", "FAIL", f"Status: {response.status_code}, Response: {data}")
+            return False
+        
+        response = requests.post(f"{BACKEND_URL}/ratings/bulk-delete", json={"company": "Bulk Test Company"}, timeout=10)
+        data = response.json()
+        if response.status_code != 200 or data.get("deleted_count") != 1:
+            log_test("POST /api/ratings/bulk-delete (filter)", "FAIL", f"Status: {response.status_code}, Response: {data}")
+            return False
+        
+        # An empty request must never behave like "delete all"
+        response = requests.post(f"{BACKEND_URL}/ratings/bulk-delete", json={}, timeout=10)
+        if response.status_code != 400:
+            log_test("POST /api/ratings/bulk-delete (empty)", "FAIL", f"Expected 400, got {response.status_code}")
+            return False
+        
+        log_test("POST /api/ratings/bulk-delete", "PASS", "ID list, filter and empty request handled correctly")
+        return True
+    except Exception as e:
+        log_test("POST /api/ratings/bulk-delete", "FAIL", f"Error: {str(e)}")
+        return False
+
+def test_company_rating_analytics():
+    """Test company and date filters on /api/ratings, /api/ratings/stats and the company breakdown"""
+    try:
+        ids = [create_test_rating(stars=s, comment="Company analytics test", company="Analytics Test Company") for s in (5, 3)]
+        if not all(ids):
+            log_test("Company rating analytics", "FAIL", "Could not create test ratings")
+            return False
+        
+        response = requests.get(f"{BACKEND_URL}/ratings", params={"company": "Analytics Test Company"}, timeout=10)
+        ratings = response.json()
+        if response.status_code != 200 or sorted(r["id"] for r in ratings) != sorted(ids):
+            log_test("GET /api/ratings?company=", "FAIL", f"Status: {response.status_code}, Response: {ratings}")
+            return False
+        
+        response = requests.get(f"{BACKEND_URL}/ratings/stats", params={"company": "Analytics Test Company"}, timeout=10)
+        stats = response.json()
+        if response.status_code != 200 or stats.get("total_ratings") != 2 or stats.get("average_stars") != 4.0:
+            log_test("GET /api/ratings/stats?company=", "FAIL", f"Status: {response.status_code}, Response: {stats}")
+            return False
+        
+        response = requests.get(f"{BACKEND_URL}/ratings/stats", params={"company": "Analytics Test Company", "timestamp_from": "2999-01-01"}, timeout=10)
+        if response.status_code != 200 or response.json().get("total_ratings") != 0:
+            log_test("GET /api/ratings/stats?timestamp_from=", "FAIL", f"Status: {response.status_code}, Response: {response.json()}")
+            return False
+        
+        response = requests.get(f"{BACKEND_URL}/ratings/companies", timeout=10)
+        breakdown = {row["company"]: row for row in response.json()} if response.status_code == 200 else {}
+        row = breakdown.get("Analytics Test Company")
+        if not row or row["total_ratings"] != 2 or row["star_distribution"]["5"] != 1 or row["star_distribution"]["3"] != 1:
+            log_test("GET /api/ratings/companies", "FAIL", f"Status: {response.status_code}, Response: {response.text[:200]}")
+            return False
+        
+        requests.post(f"{BACKEND_URL}/ratings/bulk-delete", json={"company": "Analytics Test Company"}, timeout=10)
+        log_test("Company rating analytics", "PASS", "Company/date filters and per-company breakdown correct")
+        return True
+    except Exception as e:
+        log_test("Company rating analytics", "FAIL", f"Error: {str(e)}")
+        return False
+
+def test_search_ratings():
+    """Test GET /api/ratings/search with diacritics folding, ranking and pagination"""
+    try:
+        ids = [create_test_rating(comment=c, company="Search Test Company") for c in
+               ("Skvělá káva zrzavého lišáka", "Kávu zrzavý lišák nepil", "Nic zajímavého")]
+        if not all(ids):
+            log_test("GET /api/ratings/search", "FAIL", "Could not create test ratings")
+            return False
+        
+        response = requests.get(f"{BACKEND_URL}/ratings/search", params={"q": "zrzavy lisak", "page_size": 1}, timeout=10)
+        data = response.json()
+        if response.status_code != 200 or data.get("total") != 2 or len(data.get("results", [])) != 1:
+            log_test("GET /api/ratings/search", "FAIL", f"Status: {response.status_code}, Response: {data}")
+            return False
+        if "photo" in data["results"][0] or data["results"][0]["id"] not in ids[:2]:
+            log_test("GET /api/ratings/search", "FAIL", f"Unexpected hit: {data['results'][0]}")
+            return False
+        
+        # Deleted ratings must drop out of the index
+        requests.delete(f"{BACKEND_URL}/ratings/{ids[0]}", timeout=10)
+        data = requests.get(f"{BACKEND_URL}/ratings/search", params={"q": "zrzavy lisak"}, timeout=10).json()
+        if data.get("total") != 1 or data["results"][0]["id"] != ids[1]:
+            log_test("GET /api/ratings/search (after delete)", "FAIL", f"Response: {data}")
+            return False
+        
+        requests.post(f"{BACKEND_URL}/ratings/bulk-delete", json={"company": "Search Test Company"}, timeout=10)
+        log_test("GET /api/ratings/search", "PASS", "Folded, paginated hits without photos")
+        return True
+    except Exception as e:
+        log_test("GET /api/ratings/search", "FAIL", f"Error: {str(e)}")
+        return False
+
+def test_bulk_delete_quiz_arena_scores():
+    """Test POST /api/quiz-arena/bulk-delete with a name prefix filter"""
+    try:
+        for i in range(3):
+            create_test_quiz_result(f"BulkTest {i+1}", 10, 15, 40.0)
+        create_test_quiz_result("Keep Me", 10, 15, 40.0)
+        
+        response = requests.post(f"{BACKEND_URL}/quiz-arena/bulk-delete", json={"name_prefix": "BulkTest"}, timeout=10)
+        data = response.json()
+        if response.status_code == 200 and data.get("deleted_count") == 3:
+            log_test("POST /api/quiz-arena/bulk-delete", "PASS", "Deleted 3 scores by name prefix")
+            return True
+        log_test("POST /api/quiz-arena/bulk-delete", "FAIL", f"Status: {response.status_code}, Response: {data}")
+        return False
+    except Exception as e:
+        log_test("POST /api/quiz-arena/bulk-delete", "FAIL", f"Error: {str(e)}")
+        return False
+
+def test_upload_rating_photo():
+    """Test POST /api/ratings/upload (multipart) and that deleting the rating removes the photo"""
+    try:
+        # A real 8x8 PNG: uploads are decoded and re-encoded, so a bare signature is rejected
+        png_bytes = base64.b64decode(
+            "iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAIAAABLbSncAAAAFElEQVR4nGM8ISfHgA0wYRUdtBIA0MoBFD5jqJkAAAAASUVORK5CYII="
+        )
+        response = requests.post(
+            f"{BACKEND_URL}/ratings/upload",
+            data={"stars": "5", "comment": "Multipart upload test", "company": "Upload Test"},
+            files={"photo": ("photo.png", png_bytes, "image/png")},
+            timeout=10
+        )
+        data = response.json()
+        if response.status_code != 200 or not data.get("photo"):
+            log_test("POST /api/ratings/upload", "FAIL", f"Status: {response.status_code}, Response: {data}")
+            return False
+        
+        photo_url = data["photo"].replace("/api", "", 1)
+        if requests.get(f"{BACKEND_URL}{photo_url}", timeout=10).status_code != 200:
+            log_test("POST /api/ratings/upload", "FAIL", "Uploaded photo is not served")
+            return False
+        
+        # Non-image payloads are rejected
+        response = requests.post(
+            f"{BACKEND_URL}/ratings/upload",
+            data={"stars": "5"},
+            files={"photo": ("photo.txt", b"not an image", "text/plain")},
+            timeout=10
+        )
+        if response.status_code != 415:
+            log_test("POST /api/ratings/upload (bad type)", "FAIL", f"Expected 415, got {response.status_code}")
+            return False
+        
+        requests.delete(f"{BACKEND_URL}/ratings/{data['id']}", timeout=10)
+        if requests.get(f"{BACKEND_URL}{photo_url}", timeout=10).status_code != 404:
+            log_test("POST /api/ratings/upload", "FAIL", "Photo file was not removed with its rating")
+            return False
+        
+        log_test("POST /api/ratings/upload", "PASS", "Photo stored, served and removed with its rating")
+        return True
+    except Exception as e:
+        log_test("POST /api/ratings/upload", "FAIL", f"Error: {str(e)}")
+        return False
+
 def run_ratings_deletion_tests():
     """Run comprehensive ratings deletion tests"""
     print("=" * 60)
@@ -358,6 +528,22 @@ def run_ratings_deletion_tests():
     print("Test 3: DELETE /api/ratings (delete all)")
     test_results.append(test_delete_all_ratings())
     
+    # Test 4: Bulk delete ratings
+    print("Test 4: POST /api/ratings/bulk-delete")
+    test_results.append(test_bulk_delete_ratings())
+    
+    # Test 5: Multipart upload and photo cleanup on delete
+    print("Test 5: POST /api/ratings/upload")
+    test_results.append(test_upload_rating_photo())
+    
+    # Test 6: Company and date filters
+    print("Test 6: GET /api/ratings/companies and company filters")
+    test_results.append(test_company_rating_analytics())
+    
+    # Test 7: Full-text search
+    print("Test 7: GET /api/ratings/search")
+    test_results.append(test_search_ratings())
+    
     passed = sum(test_results)
     total = len(test_results)
     
@@ -513,6 +699,10 @@ def main():
     success, _ = test_delete_all_quiz_arena_scores()
     quiz_test_results.append(success)
     
+    # Test 4: Bulk delete quiz arena scores
+    print("Test 4: POST /api/quiz-arena/bulk-delete")
+    quiz_test_results.append(test_bulk_delete_quiz_arena_scores())
+    
     quiz_passed = sum(quiz_test_results)
     quiz_total = len(quiz_test_results)
     
@@ -528,8 +718,8 @@ def main():
     print("OVERALL TEST SUMMARY - ADMIN PANEL DELETION ENDPOINTS")
     print("=" * 70)
     
-    total_tests = 6  # 3 ratings + 3 quiz arena
-    total_passed = (3 if ratings_success else 0) + quiz_passed
+    total_tests = 11  # 7 ratings + 4 quiz arena
+    total_passed = (7 if ratings_success else 0) + quiz_passed
     
     print(f"Ratings Deletion Tests: {'✅ PASS' if ratings_success else '❌ FAIL'}")
     print(f"Quiz Arena Deletion Tests: {'✅ PASS' if quiz_passed == quiz_total else '❌ FAIL'}")
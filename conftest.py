@@ -0,0 +1,4 @@
+# backend_test.py is a live smoke test against a deployed backend, run
+# directly with `python backend_test.py`; its functions report pass/fail
+# by return value, so pytest would count them as passing regardless.
+collect_ignore = ["backend_test.py"]
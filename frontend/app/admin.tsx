@@ -428,7 +428,7 @@ export default function AdminScreen() {
                       <View style={styles.photoSection}>
                         <Text style={styles.photoLabel}>Photo:</Text>
                         <Image
-                          source={{ uri: rating.photo }}
+                          source={{ uri: rating.photo.startsWith('/') ? `${BACKEND_URL}${rating.photo}` : rating.photo }}
                           style={styles.ratingPhoto}
                           resizeMode="contain"
                         />
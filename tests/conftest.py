@@ -0,0 +1,52 @@
+"""
+Shared fixtures for tests that run the API app in-process.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import catalog_tiles  # noqa: E402
+import server  # noqa: E402
+from admission import admission_controller  # noqa: E402
+from resilience import resilience  # noqa: E402
+from response_cache import response_cache  # noqa: E402
+
+
+@pytest.fixture
+def isolated_services(tmp_path, monkeypatch):
+    """Keep process-wide services and on-disk state of app tests inside tmp_path"""
+    monkeypatch.setattr(server, "CHANGE_WATCHER_ENABLED", False)
+    monkeypatch.setattr(server, "PHOTO_UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(response_cache, "enabled", False)
+    monkeypatch.setattr(admission_controller, "enabled", False)
+    monkeypatch.setattr(resilience.snapshots, "directory", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(resilience.spool, "directory", str(tmp_path / "spool"))
+    monkeypatch.setattr(catalog_tiles, "TILES_CACHE_DIR", str(tmp_path / "tiles"))
+    monkeypatch.setattr(catalog_tiles, "_manifests", {})
+
+
+@pytest.fixture
+def cached_responses(isolated_services, monkeypatch):
+    """The process-wide response cache, enabled and emptied for one test"""
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(response_cache, "_entries", type(response_cache._entries)())
+    return response_cache
+
+
+@pytest.fixture
+def make_settings(tmp_path, isolated_services):
+    """Settings for an app on its own SQLite file, without background warm-up"""
+    def make(name: str = "portal", **overrides) -> server.Settings:
+        return server.Settings(**{
+            "storage_backend": "sqlite",
+            "sqlite_path": str(tmp_path / f"{name}.db"),
+            "static_dir": str(tmp_path / f"{name}_static"),
+            "warm_up": False,
+            "catalog_tiles_on_startup": False,
+            **overrides,
+        })
+    return make
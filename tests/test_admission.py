@@ -0,0 +1,102 @@
+"""
+Tests for submit admission control: token buckets, shedding and client keys.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import admission  # noqa: E402
+from admission import AdmissionController, AdmissionMiddleware, RouteLimit, TokenBucket  # noqa: E402
+
+ROUTE = ("POST", "/api/ratings")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_at_the_rate_up_to_the_burst(clock):
+    bucket = TokenBucket(burst=2)
+    assert bucket.take(rate=1, burst=2) == 0
+    assert bucket.take(rate=1, burst=2) == 0
+    assert bucket.take(rate=1, burst=2) == pytest.approx(1.0)
+    clock[0] += 0.5
+    assert bucket.take(rate=1, burst=2) == pytest.approx(0.5)
+    # A long pause refills no more than the burst
+    clock[0] += 100
+    assert bucket.take(rate=1, burst=2) == 0
+    assert bucket.take(rate=1, burst=2) == 0
+    assert bucket.take(rate=1, burst=2) > 0
+
+
+def test_controller_sheds_by_rate_per_client(clock):
+    controller = AdmissionController({ROUTE: RouteLimit(concurrency=10, rate=1, burst=2)}, shed_writes_above=100, enabled=True)
+    assert controller.check(ROUTE, "a") is None
+    assert controller.check(ROUTE, "a") is None
+    status, retry_after, _ = controller.check(ROUTE, "a")
+    assert (status, retry_after) == (429, pytest.approx(1.0))
+    # Other clients and unlisted routes are unaffected
+    assert controller.check(ROUTE, "b") is None
+    assert controller.check(("GET", "/api/ratings"), "a") is None
+    assert controller.stats()["shed_rate"] == 1
+
+
+def test_controller_sheds_by_route_and_total_concurrency(clock):
+    controller = AdmissionController({ROUTE: RouteLimit(concurrency=1, rate=100, burst=100)}, shed_writes_above=2, enabled=True)
+    controller.enter(ROUTE)
+    assert controller.check(ROUTE, "a")[0] == 503
+    controller.leave(ROUTE)
+    assert controller.check(ROUTE, "a") is None
+
+    # Display reads count towards the total that sheds submits
+    controller.enter(("GET", "/api/quiz-arena/leaderboard"))
+    controller.enter(("GET", "/api/ratings/stats"))
+    assert controller.check(ROUTE, "a")[0] == 503
+    assert controller.stats()["shed_overload"] == 1
+    assert controller.stats()["shed_concurrency"] == 1
+
+
+def test_idle_buckets_are_pruned(clock):
+    controller = AdmissionController({ROUTE: RouteLimit(rate=1, burst=2)}, enabled=True, max_buckets=2)
+    controller.check(ROUTE, "a")
+    controller.check(ROUTE, "b")
+    clock[0] += 10
+    controller.check(ROUTE, "c")
+    assert set(client for _, client in controller._buckets) == {"c"}
+
+
+def scope(peer: str, *headers) -> dict:
+    return {"type": "http", "client": (peer, 40000), "headers": [(name.encode(), value.encode()) for name, value in headers]}
+
+
+def test_forwarded_for_is_ignored_unless_the_peer_is_a_trusted_proxy():
+    middleware = AdmissionMiddleware(None, AdmissionController(), trusted_proxies="10.0.0.0/8")
+    assert middleware._client_key(scope("203.0.113.7", ("x-forwarded-for", "1.2.3.4"))) == "203.0.113.7"
+    assert middleware._client_key(scope("10.0.0.5")) == "10.0.0.5"
+
+
+def test_client_is_the_rightmost_untrusted_forwarded_hop():
+    middleware = AdmissionMiddleware(None, AdmissionController(), trusted_proxies="10.0.0.0/8, 192.168.1.1")
+    # The client prepended a spoofed address; the proxies appended the real one
+    spoofed = ("x-forwarded-for", "1.2.3.4, 198.51.100.9, 192.168.1.1")
+    assert middleware._client_key(scope("10.0.0.5", spoofed)) == "198.51.100.9"
+    # Repeated headers are one list, in order
+    split = scope("10.0.0.5", ("x-forwarded-for", "1.2.3.4"), ("x-forwarded-for", "198.51.100.9"))
+    assert middleware._client_key(split) == "198.51.100.9"
+    # Only proxies in the chain: the leftmost one is the best we know
+    assert middleware._client_key(scope("10.0.0.5", ("x-forwarded-for", "10.1.1.1, 10.2.2.2"))) == "10.1.1.1"
+
+
+def test_client_id_header_is_opt_in():
+    headers = ("x-client-id", "kiosk-3")
+    default = AdmissionMiddleware(None, AdmissionController(), client_id_header="")
+    assert default._client_key(scope("203.0.113.7", headers)) == "203.0.113.7"
+    opted_in = AdmissionMiddleware(None, AdmissionController(), client_id_header="X-Client-Id")
+    assert opted_in._client_key(scope("203.0.113.7", headers)) == "id:kiosk-3"
@@ -0,0 +1,48 @@
+"""
+Tests for the create_app factory: per-app state and the startup knobs.
+"""
+
+import os
+import sys
+import time
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import catalog_tiles  # noqa: E402
+import server  # noqa: E402
+
+
+def test_apps_keep_their_own_settings_and_database(make_settings):
+    first = server.create_app(make_settings("first"))
+    second = server.create_app(make_settings("second"))
+    assert first.state.settings.sqlite_path != second.state.settings.sqlite_path
+
+    with TestClient(first) as first_client, TestClient(second) as second_client:
+        assert first_client.post("/api/ratings", json={"stars": 4, "comment": "first only"}).status_code == 200
+        assert len(first_client.get("/api/ratings").json()) == 1
+        assert second_client.get("/api/ratings").json() == []
+        assert second_client.get("/api/ratings/search", params={"q": "first"}).json()["total"] == 0
+
+
+def test_catalog_tiles_on_startup_is_independent_of_warm_up(make_settings):
+    settings = make_settings("tiles", catalog_tiles_on_startup=True)
+    os.makedirs(settings.catalog_dir)
+    page = os.path.join(settings.catalog_dir, "001.png")
+    Image.new("RGB", (300, 200), "red").save(page)
+
+    app = server.create_app(settings)
+    with TestClient(app):
+        deadline = time.monotonic() + 10
+        while not app.state.readiness["catalog_tiles"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert app.state.readiness["catalog_tiles"]
+        assert not app.state.readiness["indexes"]
+    assert os.path.exists(os.path.join(catalog_tiles.tiles_dir(page), "manifest.json"))
+
+    catalog_tiles._manifests.clear()
+    skipped = make_settings("skipped", static_dir=settings.static_dir)
+    with TestClient(server.create_app(skipped)) as client:
+        assert client.get("/api/health/ready").json()["catalog_tiles"] is False
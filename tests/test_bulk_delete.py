@@ -0,0 +1,90 @@
+"""
+Tests for the bulk delete endpoints, run against mongomock.
+"""
+
+import os
+import sys
+
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def app(make_settings, monkeypatch):
+    monkeypatch.setattr(server, "MongoClient", mongomock.MongoClient)
+    return server.create_app(make_settings(storage_backend="mongo"))
+
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+
+def insert_ratings(app, count: int, **fields) -> list:
+    docs = [{"stars": 4, "company": "Acme", "timestamp": f"2025-12-01T10:00:{i:02d}", **fields} for i in range(count)]
+    return [str(i) for i in app.state.db.ratings.insert_many(docs).inserted_ids]
+
+
+def test_ids_are_deleted_in_chunks_and_missing_ones_reported(app, client, monkeypatch):
+    monkeypatch.setattr(server, "BULK_DELETE_CHUNK_SIZE", 2)
+    calls = []
+    delete_many = mongomock.collection.Collection.delete_many
+    monkeypatch.setattr(mongomock.collection.Collection, "delete_many",
+                        lambda self, *args, **kwargs: calls.append(args) or delete_many(self, *args, **kwargs))
+    ids = insert_ratings(app, 5)
+    missing = str(ObjectId())
+
+    response = client.post("/api/ratings/bulk-delete", json={"ids": ids + [ids[0], missing]})
+    assert response.json() == {"success": True, "deleted_count": 5, "requested": 6, "not_found": 1}
+    # Duplicates are dropped before chunking: six distinct IDs in chunks of two
+    assert len(calls) == 3
+    assert app.state.db.ratings.count_documents({}) == 0
+
+
+def test_photo_files_are_removed_with_their_ratings(app, client):
+    os.makedirs(server.PHOTO_UPLOAD_DIR)
+    photo = os.path.join(server.PHOTO_UPLOAD_DIR, "kept.jpg")
+    deleted_photo = os.path.join(server.PHOTO_UPLOAD_DIR, "deleted.jpg")
+    for path in (photo, deleted_photo):
+        open(path, "wb").close()
+    insert_ratings(app, 1, company="Keep", photo=server.PHOTO_URL_PREFIX + "kept.jpg")
+    insert_ratings(app, 1, photo=server.PHOTO_URL_PREFIX + "deleted.jpg")
+
+    response = client.post("/api/ratings/bulk-delete", json={"company": "Acme"})
+    assert response.json() == {"success": True, "deleted_count": 1, "requested": None}
+    assert os.path.exists(photo) and not os.path.exists(deleted_photo)
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"ids": []},
+    {"ids": ["not-an-id"]},
+    {"timestamp_from": "1"},
+    {"timestamp_to": "2025-12-01T10:00:00", "timestamp_from": "soon"},
+])
+def test_invalid_requests_delete_nothing(app, client, body):
+    insert_ratings(app, 3)
+    assert client.post("/api/ratings/bulk-delete", json=body).status_code == 400
+    assert app.state.db.ratings.count_documents({}) == 3
+
+
+def test_filters_are_limited_to_their_collections(app, client):
+    assert client.post("/api/quiz/scores/bulk-delete", json={"company": "Acme"}).status_code == 400
+    assert client.post("/api/ratings/bulk-delete", json={"name_prefix": "Test"}).status_code == 400
+
+    arena = app.state.db.quiz_arena
+    arena.insert_many([
+        {"name": "Test 1", "timestamp": "2025-12-01T09:00:00"},
+        {"name": "Test 2", "timestamp": "2025-12-02T09:00:00"},
+        {"name": "Ann", "timestamp": "2025-12-01T09:00:00"},
+    ])
+    response = client.post("/api/quiz-arena/bulk-delete", json={"name_prefix": "Test", "timestamp_to": "2025-12-01"})
+    assert response.json()["deleted_count"] == 1
+    assert sorted(d["name"] for d in arena.find()) == ["Ann", "Test 2"]
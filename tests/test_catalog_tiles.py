@@ -0,0 +1,74 @@
+"""
+Tests for catalog deep-zoom tile generation.
+"""
+
+import multiprocessing
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import catalog_tiles  # noqa: E402
+
+
+def test_same_stem_different_extension_get_separate_pyramids(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_tiles, "TILES_CACHE_DIR", str(tmp_path / "tiles"))
+    monkeypatch.setattr(catalog_tiles, "_manifests", {})
+    png, jpg = str(tmp_path / "001.png"), str(tmp_path / "001.jpg")
+    Image.new("RGB", (300, 200), "red").save(png)
+    Image.new("RGB", (100, 50), "blue").save(jpg)
+
+    png_manifest = catalog_tiles.ensure_tiles(png)
+    jpg_manifest = catalog_tiles.ensure_tiles(jpg)
+    assert catalog_tiles.tiles_dir(png) != catalog_tiles.tiles_dir(jpg)
+    assert (png_manifest["width"], jpg_manifest["width"]) == (300, 100)
+
+    # Re-validating after a restart finds each pyramid intact instead of regenerating
+    generated = []
+    monkeypatch.setattr(catalog_tiles, "_manifests", {})
+    monkeypatch.setattr(catalog_tiles, "_generate", lambda *args: generated.append(args))
+    assert catalog_tiles.ensure_tiles(png)["sha256"] == png_manifest["sha256"]
+    assert catalog_tiles.ensure_tiles(jpg)["sha256"] == jpg_manifest["sha256"]
+    assert generated == []
+    assert os.path.exists(catalog_tiles.tile_path(jpg, jpg_manifest["max_level"], 0, 0))
+
+
+def generate_in_worker(source: str, barrier, results):
+    barrier.wait()
+    try:
+        results.put(catalog_tiles.ensure_tiles(source)["sha256"])
+    except Exception as e:
+        results.put(repr(e))
+
+
+def test_workers_sharing_the_cache_generate_each_pyramid_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_tiles, "TILES_CACHE_DIR", str(tmp_path / "tiles"))
+    monkeypatch.setattr(catalog_tiles, "_manifests", {})
+    source = str(tmp_path / "001.png")
+    Image.new("RGB", (600, 400), "green").save(source)
+    generated = tmp_path / "generated.log"
+    generate = catalog_tiles._generate
+
+    def counting_generate(*args):
+        with open(generated, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return generate(*args)
+
+    monkeypatch.setattr(catalog_tiles, "_generate", counting_generate)
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(4), context.Queue()
+    workers = [context.Process(target=generate_in_worker, args=(source, barrier, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    hashes = {results.get(timeout=60) for _ in workers}
+    for worker in workers:
+        worker.join()
+
+    assert hashes == {catalog_tiles.file_sha256(source)}
+    assert len(generated.read_text().split()) == 1
+    # No temporary or replaced pyramids are left behind, also after a regeneration
+    assert sorted(os.listdir(tmp_path / "tiles")) == [".001.png.lock", "001.png"]
+    catalog_tiles.ensure_tiles(source, force=True)
+    assert sorted(os.listdir(tmp_path / "tiles")) == [".001.png.lock", "001.png"]
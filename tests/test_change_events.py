@@ -0,0 +1,166 @@
+"""
+Tests for the change stream watcher, using in-memory stand-ins for a
+replica-set collection (supports watch()) and a standalone one (does not).
+"""
+
+import os
+import queue
+import sys
+import threading
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from change_events import (  # noqa: E402
+    CHANGE_STREAM_HISTORY_LOST,
+    CHANGE_STREAM_NOT_SUPPORTED,
+    ChangeWatcher,
+)
+
+
+class FakeChangeStream:
+    def __init__(self, collection):
+        self.collection = collection
+        self.alive = True
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.alive = False
+
+    def try_next(self):
+        try:
+            change = self.collection.changes.get(timeout=0.01)
+        except queue.Empty:
+            return None
+        if isinstance(change, Exception):
+            raise change
+        self.resume_token = change["_id"]
+        return change
+
+
+class ReplicaSetCollection:
+    """Collection stand-in that records resume tokens and emits queued changes"""
+
+    def __init__(self, name):
+        self.name = name
+        self.changes = queue.Queue()
+        self.resumed_with = []
+        self._seq = 0
+
+    def watch(self, resume_after=None, max_await_time_ms=None):
+        self.resumed_with.append(resume_after)
+        return FakeChangeStream(self)
+
+    def emit(self, operation, document_id):
+        self._seq += 1
+        self.changes.put({
+            "_id": {"_data": f"token-{self._seq}"},
+            "operationType": operation,
+            "documentKey": {"_id": document_id},
+        })
+
+
+class StandaloneCollection:
+    """Collection stand-in for a standalone mongod without change streams"""
+
+    def __init__(self, name):
+        self.name = name
+        self.ids = []
+
+    def watch(self, resume_after=None, max_await_time_ms=None):
+        raise OperationFailure("not a replica set", code=CHANGE_STREAM_NOT_SUPPORTED)
+
+    def estimated_document_count(self):
+        return len(self.ids)
+
+    def find_one(self, filter, projection, sort):
+        return {"_id": max(self.ids)} if self.ids else None
+
+
+def collect_events(watcher, expected):
+    events = []
+    done = threading.Event()
+
+    def on_event(event):
+        events.append(event)
+        if len(events) >= expected:
+            done.set()
+
+    watcher.subscribe(on_event)
+    return events, done
+
+
+def test_publishes_changes_and_persists_resume_token(tmp_path):
+    collection = ReplicaSetCollection("ratings")
+    watcher = ChangeWatcher([collection], token_dir=str(tmp_path), max_await_ms=10)
+    events, done = collect_events(watcher, 2)
+    watcher.start()
+    try:
+        first, second = ObjectId(), ObjectId()
+        collection.emit("insert", first)
+        collection.emit("delete", second)
+        assert done.wait(2)
+    finally:
+        watcher.stop()
+
+    assert [(e["operation"], e["document_id"]) for e in events] == [("insert", str(first)), ("delete", str(second))]
+    assert watcher.modes == {"ratings": "change_stream"}
+    assert watcher.load_token("ratings") == {"_data": "token-2"}
+
+
+def test_restart_resumes_after_persisted_token(tmp_path):
+    collection = ReplicaSetCollection("quiz_arena")
+    ChangeWatcher([collection], token_dir=str(tmp_path)).save_token("quiz_arena", {"_data": "token-7"})
+
+    watcher = ChangeWatcher([collection], token_dir=str(tmp_path), max_await_ms=10)
+    events, done = collect_events(watcher, 1)
+    watcher.start()
+    try:
+        collection.emit("insert", ObjectId())
+        assert done.wait(2)
+    finally:
+        watcher.stop()
+
+    assert collection.resumed_with[0] == {"_data": "token-7"}
+
+
+def test_lost_history_drops_token_and_invalidates(tmp_path):
+    collection = ReplicaSetCollection("quiz_scores")
+    watcher = ChangeWatcher([collection], token_dir=str(tmp_path), max_await_ms=10)
+    watcher.save_token("quiz_scores", {"_data": "stale"})
+    events, done = collect_events(watcher, 1)
+    collection.changes.put(OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST))
+    watcher.start()
+    try:
+        assert done.wait(2)
+    finally:
+        watcher.stop()
+
+    assert events[0] == {"collection": "quiz_scores", "operation": "invalidate", "document_id": None}
+    assert collection.resumed_with[-1] is None
+
+
+def test_standalone_falls_back_to_polling(tmp_path):
+    collection = StandaloneCollection("ratings")
+    watcher = ChangeWatcher([collection], token_dir=str(tmp_path), poll_interval=0.01)
+    events, done = collect_events(watcher, 1)
+    watcher.start()
+    try:
+        # Let the first poll record a baseline fingerprint before writing
+        for _ in range(200):
+            if watcher.modes.get("ratings") == "polling":
+                break
+            threading.Event().wait(0.01)
+        threading.Event().wait(0.05)
+        collection.ids.append(ObjectId())
+        assert done.wait(2)
+    finally:
+        watcher.stop()
+
+    assert watcher.modes == {"ratings": "polling"}
+    assert events[0]["operation"] == "invalidate"
@@ -0,0 +1,129 @@
+"""
+Tests for rating photo normalization and the processor's queue accounting and cleanup.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import image_processing  # noqa: E402
+from image_processing import BrokenProcessPool, DecompressionBombError, ImageProcessingBusy, ImageProcessor  # noqa: E402
+
+real_normalize_photo = image_processing.normalize_photo
+
+
+def slow_normalize(src_path, dest_path, max_dimension, quality):
+    time.sleep(0.3)
+    with open(dest_path, "wb") as f:
+        f.write(b"late output")
+    return {"started": time.time(), "processing_time": 0.3}
+
+
+def test_timed_out_job_still_counts_as_pending_and_its_output_is_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_processing, "normalize_photo", slow_normalize)
+    processor = ImageProcessor(workers=1, queue_limit=1, timeout=0.05)
+    processor._executor = ThreadPoolExecutor(max_workers=1)
+    dest = tmp_path / "out.jpg"
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.normalize(str(tmp_path / "in.jpg"), str(dest))
+        # The job is still running, so the queue limit must still see it
+        assert processor.stats()["pending"] == 1
+        with pytest.raises(ImageProcessingBusy):
+            await processor.normalize(str(tmp_path / "in.jpg"), str(tmp_path / "other.jpg"))
+
+    asyncio.run(scenario())
+    processor._executor.shutdown(wait=True)
+    assert processor.stats()["pending"] == 0
+    assert processor.stats()["timed_out"] == 1
+    assert not dest.exists()
+
+
+def normalize_or_die(src_path, dest_path, max_dimension, quality):
+    if src_path.endswith("crash.png"):
+        # Like a worker killed by the OOM killer
+        os._exit(1)
+    return real_normalize_photo(src_path, dest_path, max_dimension, quality)
+
+
+def test_pool_is_replaced_after_a_worker_dies(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_processing, "normalize_photo", normalize_or_die)
+    for name in ("crash.png", "ok.png"):
+        Image.new("RGB", (8, 8)).save(tmp_path / name)
+    processor = ImageProcessor(workers=1, queue_limit=4, timeout=30)
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await processor.normalize(str(tmp_path / "crash.png"), str(tmp_path / "crash.jpg"))
+        return await processor.normalize(str(tmp_path / "ok.png"), str(tmp_path / "ok.jpg"))
+
+    try:
+        assert asyncio.run(scenario())["width"] == 8
+    finally:
+        processor.shutdown()
+    stats = processor.stats()
+    assert (stats["failed"], stats["pool_restarts"], stats["processed"], stats["pending"]) == (1, 1, 1, 0)
+
+
+def normalize(tmp_path, img: Image.Image, src_name: str = "in.png", max_dimension: int = 1600,
+              **save_options) -> Image.Image:
+    src, dest = tmp_path / src_name, tmp_path / "out.jpg"
+    img.save(src, **save_options)
+    info = image_processing.normalize_photo(str(src), str(dest), max_dimension, 85)
+    out = Image.open(dest)
+    assert (out.format, out.size) == ("JPEG", (info["width"], info["height"]))
+    return out
+
+
+def test_normalize_photo_caps_the_resolution_as_jpeg(tmp_path):
+    out = normalize(tmp_path, Image.new("RGB", (3000, 1000), "red"), max_dimension=1600)
+    assert out.size == (1600, 533)
+    # Smaller photos are not upscaled
+    assert normalize(tmp_path, Image.new("L", (300, 200))).size == (300, 200)
+
+
+def test_normalize_photo_applies_the_orientation_and_strips_exif(tmp_path):
+    img = Image.new("RGB", (40, 20), "red")
+    img.paste((0, 0, 255), (0, 0, 10, 20))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise for display
+    exif[0x8825] = {1: "N", 2: (50.0, 5.0, 0.0)}  # GPS
+    out = normalize(tmp_path, img, "in.jpg", exif=exif.tobytes())
+
+    # The blue left edge is now at the top
+    assert out.size == (20, 40)
+    red, green, blue = out.getpixel((10, 2))
+    assert blue > 200 and red < 50
+    assert out.getpixel((10, 37))[0] > 200
+    assert len(out.getexif()) == 0
+    assert "exif" not in out.info
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "P"])
+def test_normalize_photo_flattens_transparency_onto_white(tmp_path, mode):
+    img = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+    img.paste((0, 128, 0, 255), (0, 0, 5, 10))
+    if mode == "P":
+        img = img.convert("P")
+        img.info["transparency"] = img.getpixel((9, 9))
+    out = normalize(tmp_path, img)
+    assert out.mode == "RGB"
+    assert all(channel > 245 for channel in out.getpixel((8, 5)))
+    assert out.getpixel((1, 5))[1] > 100 and out.getpixel((1, 5))[0] < 30
+
+
+def test_normalize_photo_rejects_decompression_bombs(tmp_path, monkeypatch):
+    src = tmp_path / "big.png"
+    Image.new("RGB", (200, 200)).save(src)
+    # Pillow raises once an image exceeds twice the limit
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10000)
+    with pytest.raises(DecompressionBombError):
+        image_processing.normalize_photo(str(src), str(tmp_path / "out.jpg"), 1600, 85)
@@ -0,0 +1,158 @@
+"""
+Tests for the embedded SQLite store against the queries server.py issues.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import local_store  # noqa: E402
+from local_store import LocalClient, sync_to_mongo  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    return LocalClient(str(tmp_path / "local.db"))["inovix_portal"]
+
+
+@pytest.fixture
+def arena(db):
+    collection = db["quiz_arena"]
+    collection.create_index([("correct_answers", -1), ("average_time", 1)])
+    collection.insert_many([
+        {"name": "Ann", "correct_answers": 10, "total_questions": 15, "average_time": 12.345, "timestamp": "2025-12-01T10:00:00"},
+        {"name": "Bob", "correct_answers": 12, "total_questions": 15, "average_time": 10.0, "timestamp": "2025-12-01T11:00:00"},
+        {"name": "Cid", "correct_answers": 12, "total_questions": 15, "average_time": 9.5, "timestamp": "2025-12-01T12:00:00"},
+        {"name": "Test 1", "correct_answers": 3, "timestamp": "2025-12-01T13:00:00", "average_time": 20.0},
+    ])
+    return collection
+
+
+def test_sorted_leaderboard_with_limit(arena):
+    names = [doc["name"] for doc in arena.find().sort([("correct_answers", -1), ("average_time", 1)]).limit(3)]
+    assert names == ["Cid", "Bob", "Ann"]
+
+
+def test_filters_and_counts(arena):
+    assert arena.count_documents({}) == 4
+    assert arena.count_documents({"correct_answers": {"$lt": 12}}) == 2
+    assert arena.count_documents({"name": {"$regex": "^Test"}}) == 1
+    assert arena.count_documents({"timestamp": {"$gte": "2025-12-01T11:00:00", "$lte": "2025-12-01T12:00:00"}}) == 2
+    ids = [doc["_id"] for doc in arena.find({}, {"_id": 1})]
+    assert arena.count_documents({"_id": {"$in": ids[:2]}}) == 2
+
+
+def test_projection_expressions(arena):
+    rows = arena.aggregate([
+        {"$sort": {"timestamp": 1}},
+        {"$limit": 1},
+        {"$project": {
+            "_id": {"$toString": "$_id"},
+            "name": 1,
+            "average_time": {"$round": ["$average_time", 2]},
+            "instagram": {"$ifNull": ["$instagram", ""]},
+        }},
+    ])
+    assert rows == [{"_id": rows[0]["_id"], "name": "Ann", "average_time": 12.35, "instagram": ""}]
+    assert ObjectId.is_valid(rows[0]["_id"])
+
+
+def test_group_accumulators(arena, db):
+    result = arena.aggregate([{"$group": {"_id": None, "max": {"$max": "$correct_answers"}, "avg": {"$avg": "$average_time"}}}])
+    assert result[0]["max"] == 12
+    assert result[0]["avg"] == pytest.approx((12.345 + 10.0 + 9.5 + 20.0) / 4)
+    assert db["empty"].aggregate([{"$group": {"_id": None, "avg": {"$avg": "$stars"}}}]) == []
+
+    # Expressions inside accumulators are evaluated in Python
+    rates = arena.aggregate([
+        {"$match": {"total_questions": 15}},
+        {"$project": {"rate": {"$multiply": [{"$divide": ["$correct_answers", "$total_questions"]}, 100]}}},
+        {"$group": {"_id": None, "avg_rate": {"$avg": "$rate"}}},
+    ])
+    assert rates[0]["avg_rate"] == pytest.approx((10 + 12 + 12) / 15 * 100 / 3)
+
+    perfect = arena.aggregate([
+        {"$group": {"_id": "$correct_answers", "fast": {"$sum": {"$cond": [{"$eq": ["$average_time", 9.5]}, 1, 0]}}}},
+        {"$sort": {"_id": -1}},
+    ])
+    assert perfect[0] == {"_id": 12, "fast": 1}
+
+
+def test_compound_group_key_runs_in_sql(arena, monkeypatch):
+    pipeline = [
+        {"$match": {"total_questions": 15}},
+        {"$group": {"_id": {"correct": "$correct_answers", "total": "$total_questions"}, "count": {"$sum": 1}}},
+    ]
+    in_python = sorted(arena._run_stages(arena.find({"total_questions": 15}), pipeline[1:]), key=repr)
+
+    monkeypatch.setattr(local_store, "_group", lambda docs, spec: pytest.fail("grouped in Python"))
+    in_sql = sorted(arena.aggregate(pipeline), key=repr)
+    assert in_sql == in_python == [
+        {"_id": {"correct": 10, "total": 15}, "count": 1},
+        {"_id": {"correct": 12, "total": 15}, "count": 2},
+    ]
+
+
+def test_deletes(arena):
+    first = arena.find_one({"name": "Ann"})
+    deleted = arena.find_one_and_delete({"_id": first["_id"]}, {"name": 1})
+    assert deleted == {"_id": first["_id"], "name": "Ann"}
+    assert arena.find_one_and_delete({"_id": first["_id"]}) is None
+    assert arena.delete_many({"correct_answers": 12}).deleted_count == 2
+    assert arena.delete_one({"name": "Missing"}).deleted_count == 0
+    assert arena.count_documents({}) == 1
+
+
+def test_find_one_and_delete_hands_each_document_to_one_caller(db):
+    ratings = db["ratings"]
+    ratings.insert_many([{"stars": i % 5 + 1} for i in range(60)])
+    deleted, barrier = [], threading.Barrier(6)
+
+    def worker():
+        barrier.wait()
+        while True:
+            doc = ratings.find_one_and_delete({})
+            if doc is None:
+                return
+            deleted.append(doc["_id"])
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(deleted) == len(set(deleted)) == 60
+
+
+def test_insert_many_is_one_transaction(db):
+    ratings = db["ratings"]
+    statements = []
+    ratings._conn().set_trace_callback(statements.append)
+    ratings.insert_many([{"stars": 5} for _ in range(3)])
+    assert statements[0] == "BEGIN IMMEDIATE" and statements[-1] == "COMMIT"
+
+    # An ordered insert failing on a duplicate key leaves nothing behind
+    existing = ratings.find_one()["_id"]
+    with pytest.raises(sqlite3.IntegrityError):
+        ratings.insert_many([{"stars": 1}, {"_id": existing, "stars": 1}])
+    assert ratings.count_documents({}) == 3
+
+
+def test_sync_preserves_ids_and_is_idempotent(arena):
+    target = mongomock.MongoClient()["inovix_portal"]
+    source = arena.database.client
+    assert sync_to_mongo(source, target, ["quiz_arena"], batch_size=3) == {"quiz_arena": 4}
+    assert {d["_id"] for d in target["quiz_arena"].find()} == {d["_id"] for d in arena.find()}
+
+    # A re-run hits duplicate keys in every batch and only counts new documents
+    assert sync_to_mongo(source, target, ["quiz_arena"], batch_size=3) == {"quiz_arena": 0}
+    target["quiz_arena"].delete_one({"name": "Bob"})
+    assert sync_to_mongo(source, target, ["quiz_arena"], batch_size=3) == {"quiz_arena": 1}
+    assert target["quiz_arena"].count_documents({}) == 4
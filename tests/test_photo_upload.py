@@ -0,0 +1,135 @@
+"""
+Tests for the multipart rating upload endpoint's size limits and photo cleanup.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+
+BOUNDARY = "upload-test-boundary"
+
+
+@pytest.fixture
+def client(make_settings, monkeypatch):
+    monkeypatch.setattr(server, "MAX_PHOTO_BYTES", 20 * 1024)
+    monkeypatch.setattr(server, "IMAGE_PROCESSING_ENABLED", False)
+    with TestClient(server.create_app(make_settings())) as client:
+        yield client
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def multipart_chunks(photo_size: int) -> list:
+    """A multipart body with a `photo_size` byte photo, split into 8 KiB chunks"""
+    body = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="stars"\r\n\r\n5\r\n'
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="photo"; filename="p.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n').encode()
+    body += png_bytes() + b"\0" * photo_size + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return [body[i:i + 8192] for i in range(0, len(body), 8192)]
+
+
+def post_chunked(app, chunks: list) -> tuple:
+    """POST a chunked body straight through ASGI; returns (status, number of chunks the app read)
+
+    TestClient reads a streamed body completely before the app sees it,
+    so it cannot show where the app stops reading.
+    """
+    remaining, statuses = iter(chunks), []
+    read = 0
+
+    async def receive():
+        nonlocal read
+        chunk = next(remaining, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        read += 1
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/ratings/upload", "raw_path": b"/api/ratings/upload", "root_path": "", "query_string": b"",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"transfer-encoding", b"chunked"),
+        ],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return statuses[0], read
+
+
+def test_upload_within_the_limit_is_stored(client):
+    response = client.post("/api/ratings/upload", data={"stars": "5"}, files={"photo": ("p.png", png_bytes(), "image/png")})
+    assert response.status_code == 200
+    assert os.path.exists(os.path.join(server.PHOTO_UPLOAD_DIR, os.path.basename(response.json()["photo"])))
+
+
+def test_upload_is_normalized_to_jpeg_when_processing_is_enabled(client, monkeypatch):
+    monkeypatch.setattr(server, "IMAGE_PROCESSING_ENABLED", True)
+    response = client.post("/api/ratings/upload", data={"stars": "5"}, files={"photo": ("p.png", png_bytes(), "image/png")})
+    assert response.status_code == 200
+    filename = os.path.basename(response.json()["photo"])
+    assert filename.endswith(".jpg")
+    with Image.open(os.path.join(server.PHOTO_UPLOAD_DIR, filename)) as stored:
+        assert (stored.format, stored.size) == ("JPEG", (8, 8))
+    assert os.listdir(server.PHOTO_UPLOAD_DIR) == [filename]
+
+
+def test_chunked_upload_is_cut_off_once_over_the_limit(client):
+    chunks = multipart_chunks(10 * server.MAX_PHOTO_BYTES)
+    status, read = post_chunked(client.app, chunks)
+    assert status == 413
+    limit_chunks = (server.MAX_PHOTO_BYTES + server.MAX_UPLOAD_FORM_OVERHEAD) // 8192 + 1
+    assert read <= limit_chunks < len(chunks)
+    assert client.get("/api/ratings").json() == []
+    assert not os.path.isdir(server.PHOTO_UPLOAD_DIR) or os.listdir(server.PHOTO_UPLOAD_DIR) == []
+
+
+@pytest.mark.parametrize("content_length, status", [("abc", 400), ("-1", 400), (str(10 ** 9), 413)])
+def test_content_length_is_checked_before_reading(client, content_length, status):
+    response = client.post(
+        "/api/ratings/upload",
+        content=b"",
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", "Content-Length": content_length},
+    )
+    assert response.status_code == status
+
+
+def test_broken_processing_pool_is_a_retryable_error(client, monkeypatch):
+    monkeypatch.setattr(server, "IMAGE_PROCESSING_ENABLED", True)
+
+    async def broken(src_path, dest_path):
+        raise server.BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+    monkeypatch.setattr(client.app.state.image_processor, "normalize", broken)
+    response = client.post("/api/ratings/upload", data={"stars": "5"}, files={"photo": ("p.png", png_bytes(), "image/png")})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    assert os.listdir(server.PHOTO_UPLOAD_DIR) == []
+
+
+def test_delete_all_ratings_keeps_in_flight_uploads(client):
+    stored = client.post("/api/ratings/upload", data={"stars": "4"}, files={"photo": ("p.png", png_bytes(), "image/png")})
+    in_flight = os.path.join(server.PHOTO_UPLOAD_DIR, "tmp1234.part")
+    open(in_flight, "wb").close()
+
+    assert client.delete("/api/ratings").json()["deleted_count"] == 1
+    assert os.listdir(server.PHOTO_UPLOAD_DIR) == ["tmp1234.part"]
+    assert client.get(stored.json()["photo"]).status_code == 404
@@ -0,0 +1,67 @@
+"""
+Tests for the company/date filters of the rating endpoints.
+"""
+
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+from server import timestamp_range  # noqa: E402
+
+
+def test_timestamp_range_normalizes_to_the_stored_format():
+    assert timestamp_range("2025-12-01", "2025-12-01") == {
+        "timestamp": {"$gte": "2025-12-01T00:00:00", "$lte": "2025-12-01T23:59:59.999999"}
+    }
+    # Aware timestamps are converted to the naive UTC that submissions store
+    assert timestamp_range("2025-12-01T10:00:00+01:00", None) == {"timestamp": {"$gte": "2025-12-01T09:00:00"}}
+    assert timestamp_range(None, "2025-12-01T10:30") == {"timestamp": {"$lte": "2025-12-01T10:30:00"}}
+    assert timestamp_range(None, None) == {}
+
+
+@pytest.mark.parametrize("value", ["1", "yesterday", "2025-13-01", "2025-12-01T25:00"])
+def test_timestamp_range_rejects_invalid_bounds(value):
+    with pytest.raises(HTTPException) as error:
+        timestamp_range(value, None)
+    assert error.value.status_code == 400
+
+
+def test_rating_endpoints_filter_by_day_and_reject_invalid_dates(make_settings):
+    app = server.create_app(make_settings())
+    with TestClient(app) as client:
+        app.state.db.ratings.insert_many([
+            {"stars": 5, "company": "Acme", "comment": "", "photo": "", "timestamp": "2025-12-01T08:00:00"},
+            {"stars": 3, "company": "Acme", "comment": "", "photo": "", "timestamp": "2025-12-01T18:30:00.250000"},
+            {"stars": 1, "company": "Other", "comment": "", "photo": "", "timestamp": "2025-12-02T00:00:00"},
+        ])
+        day = {"timestamp_from": "2025-12-01", "timestamp_to": "2025-12-01"}
+        assert [r["stars"] for r in client.get("/api/ratings", params=day).json()] == [3, 5]
+        assert client.get("/api/ratings/stats", params=day).json()["total_ratings"] == 2
+        assert [c["company"] for c in client.get("/api/ratings/companies", params=day).json()] == ["Acme"]
+
+        for path in ("/api/ratings", "/api/ratings/stats", "/api/ratings/companies"):
+            response = client.get(path, params={"timestamp_from": "not-a-date"})
+            assert response.status_code == 400, path
+
+
+def test_company_breakdown_folds_grouped_counts(make_settings):
+    app = server.create_app(make_settings())
+    with TestClient(app) as client:
+        app.state.db.ratings.insert_many([
+            {"stars": stars, "company": company, "timestamp": "2025-12-01T08:00:00"}
+            for company, stars in [("Acme", 5), ("Acme", 4), ("Acme", 5), ("Beta", 2), ("Alfa", 3)]
+        ])
+        assert client.get("/api/ratings/companies").json() == [
+            {"company": "Acme", "total_ratings": 3, "average_stars": 4.67,
+             "star_distribution": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 2}},
+            {"company": "Alfa", "total_ratings": 1, "average_stars": 3.0,
+             "star_distribution": {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}},
+            {"company": "Beta", "total_ratings": 1, "average_stars": 2.0,
+             "star_distribution": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 0}},
+        ]
@@ -0,0 +1,86 @@
+"""
+Tests for read-preference routing of admin/analytics reads.
+
+The last test runs against a real replica set when MONGO_REPLICA_SET_URL
+is set, e.g. a local one started with
+`mongod --replSet rs0 --port 27017` (plus two more members) and
+`rs.initiate()`:
+
+    MONGO_REPLICA_SET_URL="mongodb://localhost:27017/?replicaSet=rs0" pytest tests/test_read_routing.py
+"""
+
+import os
+import sys
+
+import pytest
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from local_store import LocalClient  # noqa: E402
+from read_routing import ReadRouting, build_read_preference  # noqa: E402
+
+REPLICA_SET_URL = os.getenv("MONGO_REPLICA_SET_URL")
+
+
+def test_build_read_preference_validates_settings():
+    assert build_read_preference("secondaryPreferred", 120) == SecondaryPreferred(max_staleness=120)
+    assert build_read_preference("primary") == Primary()
+    with pytest.raises(ValueError):
+        build_read_preference("secondaryPreferred", 30)
+    with pytest.raises(ValueError):
+        build_read_preference("primary", 90)
+    with pytest.raises(ValueError):
+        build_read_preference("fastest")
+
+
+def test_only_analytics_handles_change_read_preference():
+    client = MongoClient("mongodb://localhost:27017/?replicaSet=rs0", connect=False)
+    ratings = client["routing_test"]["ratings"]
+    routing = ReadRouting(client, [ratings], "secondaryPreferred", 90)
+
+    assert routing.analytics(ratings).read_preference == SecondaryPreferred(max_staleness=90)
+    assert ratings.read_preference == Primary()
+    assert routing.stats()["analytics"] == {"mode": "secondaryPreferred", "max_staleness_seconds": 90}
+    assert routing.stats()["analytics_reads"] == {"ratings": 1}
+    client.close()
+
+
+def test_only_replica_set_reads_may_come_from_secondaries(tmp_path):
+    replica_set = MongoClient("mongodb://localhost:27017/?replicaSet=rs0", connect=False)
+    standalone = MongoClient("mongodb://localhost:27017/?directConnection=true", connect=False)
+    try:
+        ratings = replica_set["routing_test"]["ratings"]
+        assert ReadRouting(replica_set, [ratings], "secondaryPreferred", 90).may_read_secondaries
+        assert not ReadRouting(replica_set, [ratings], "primary").may_read_secondaries
+        direct = ReadRouting(standalone, [standalone["routing_test"]["ratings"]], "secondaryPreferred", 90)
+        assert not direct.may_read_secondaries
+        assert direct.stats()["cached"]
+    finally:
+        replica_set.close()
+        standalone.close()
+    embedded = LocalClient(str(tmp_path / "portal.db"))
+    routing = ReadRouting(embedded, [embedded["portal"]["ratings"]], "secondaryPreferred", 90)
+    assert routing.stats()["topology"] == "embedded" and not routing.may_read_secondaries
+
+
+@pytest.mark.skipif(not REPLICA_SET_URL, reason="MONGO_REPLICA_SET_URL not set")
+def test_analytics_reads_are_served_by_a_secondary():
+    client = MongoClient(REPLICA_SET_URL, serverSelectionTimeoutMS=5000)
+    ratings = client["routing_test"]["ratings"]
+    try:
+        ratings.insert_one({"stars": 5, "company": "Routing"})
+        routing = ReadRouting(client, [ratings], "secondaryPreferred", 90)
+
+        primary_cursor = ratings.find({"company": "Routing"})
+        list(primary_cursor)
+        assert primary_cursor.address == client.primary
+
+        analytics_cursor = routing.analytics(ratings).find({"company": "Routing"})
+        list(analytics_cursor)
+        assert analytics_cursor.address in client.secondaries
+        assert routing.stats()["topology"] == "ReplicaSetWithPrimary"
+    finally:
+        client.drop_database("routing_test")
+        client.close()
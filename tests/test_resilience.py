@@ -0,0 +1,193 @@
+"""
+Tests for degraded mode: the circuit breaker, snapshots, the submission
+spool, and how the breaker sits behind the response cache.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import ConnectionFailure
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import resilience  # noqa: E402
+from local_store import LocalClient  # noqa: E402
+from resilience import CircuitBreaker, Resilience, SnapshotStore, SubmissionSpool  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures_and_half_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock[0] += 10
+    assert breaker.state == "half_open" and breaker.allow()
+    # A failed trial reopens at once; a successful one closes
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock[0] += 10
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats() == {"state": "closed", "failures": 0, "opened": 2, "rejected": 1}
+
+
+def test_cached_bodies_are_served_while_the_breaker_is_open(tmp_path):
+    cache = ResponseCache(max_entries=10, ttl=60, shared_path="", enabled=True)
+    guard = Resilience()
+    guard.snapshots = SnapshotStore(str(tmp_path), interval=0)
+    database = {"up": True, "calls": 0}
+
+    @cache.cached("quiz_arena")
+    @guard.read("leaderboard")
+    async def leaderboard(limit: int = 10):
+        database["calls"] += 1
+        try:
+            if not database["up"]:
+                raise ConnectionFailure("no primary")
+            return [{"rank": 1, "limit": limit}]
+        except ConnectionFailure:
+            raise HTTPException(status_code=500, detail="Error fetching leaderboard")
+
+    def get(**params):
+        return asyncio.run(leaderboard(**params))
+
+    assert get().body == b'[{"rank":1,"limit":10}]'
+    database["up"] = False
+    guard.breaker.opened_at = resilience.time.monotonic()
+    fresh_from_cache = get()
+    assert fresh_from_cache.body == b'[{"rank":1,"limit":10}]'
+    assert "x-data-stale" not in fresh_from_cache.headers
+    assert database["calls"] == 1
+
+    # After a write the cached body is unreachable: the snapshot is served, and not cached
+    cache.bump("quiz_arena")
+    stale = get()
+    assert stale.headers["x-data-stale"] == "true"
+    database["up"] = True
+    guard.breaker.record_success()
+    assert "x-data-stale" not in get().headers
+    assert database["calls"] == 2
+
+    # Nothing cached or snapshotted for these params: fail fast
+    database["up"] = False
+    guard.breaker.opened_at = resilience.time.monotonic()
+    with pytest.raises(HTTPException) as error:
+        get(limit=3)
+    assert error.value.status_code == 503
+
+
+def test_snapshots_persist_through_per_process_temporary_files(tmp_path, monkeypatch):
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(resilience.os, "replace", lambda src, dst: replaced.append(src) or replace(src, dst))
+    store = SnapshotStore(str(tmp_path), interval=0)
+    store.save("leaderboard", b'[{"rank":1}]')
+
+    assert replaced == [str(tmp_path / f"leaderboard.json.{os.getpid()}.tmp")]
+    assert os.listdir(tmp_path) == ["leaderboard.json"]
+    saved_at, body = SnapshotStore(str(tmp_path)).load("leaderboard")
+    assert body == b'[{"rank":1}]'
+
+
+def test_snapshots_are_bounded_in_memory_and_on_disk(tmp_path):
+    # A file left by an earlier run counts towards the bound too
+    tmp_path.joinpath("old_0123456789ab.json").write_bytes(b'{"saved_at": "2025-12-01T00:00:00", "body": []}')
+    os.utime(tmp_path / "old_0123456789ab.json", (0, 0))
+    store = SnapshotStore(str(tmp_path), interval=0, max_entries=3)
+    for i in range(100):
+        store.save(f"rating_stats_{i:012x}", b'{"total_ratings":%d}' % i)
+        # Recently used keys are kept
+        store.load("rating_stats_000000000000")
+
+    assert sorted(os.listdir(tmp_path)) == [f"rating_stats_{i:012x}.json" for i in (0, 98, 99)]
+    assert list(store.stats()) == ["rating_stats_000000000062", "rating_stats_000000000063", "rating_stats_000000000000"]
+
+
+def test_spool_replays_once_and_keeps_failed_claims(tmp_path):
+    spool = SubmissionSpool(str(tmp_path))
+    docs = [{"_id": ObjectId(), "stars": 5}, {"_id": ObjectId(), "stars": 3}]
+    for doc in docs:
+        spool.append("ratings", doc)
+    assert spool.pending() == {"ratings": 2}
+
+    class Unavailable:
+        def insert_many(self, docs, ordered):
+            raise ConnectionError("down")
+
+    try:
+        spool.replay({"ratings": Unavailable()})
+    except ConnectionError:
+        pass
+    # The claimed file is still counted and replayed by the next attempt, with later appends
+    spool.append("ratings", {"_id": ObjectId(), "stars": 1})
+    assert spool.pending() == {"ratings": 3}
+
+    ratings = mongomock.MongoClient().db.ratings
+    assert spool.replay({"ratings": ratings}) == {"ratings": 3}
+    assert ratings.count_documents({}) == 3
+    assert spool.pending() == {}
+    assert spool.replay({"ratings": ratings}) == {}
+
+
+def test_claims_of_dead_workers_are_taken_over(tmp_path):
+    process = multiprocessing.get_context("fork").Process(target=lambda: None)
+    process.start()
+    process.join()
+    spool = SubmissionSpool(str(tmp_path))
+    spool.append("ratings", {"_id": ObjectId(), "stars": 4})
+    os.rename(tmp_path / "ratings.jsonl", tmp_path / f"ratings.{process.pid}.dead0000.replay")
+    # A claim of a live worker is left alone
+    spool.append("ratings", {"_id": ObjectId(), "stars": 2})
+    os.rename(tmp_path / "ratings.jsonl", tmp_path / f"ratings.{os.getppid()}.live0000.replay")
+
+    ratings = mongomock.MongoClient().db.ratings
+    assert spool.replay({"ratings": ratings}) == {"ratings": 1}
+    assert [d["stars"] for d in ratings.find()] == [4]
+    assert spool.pending() == {"ratings": 1}
+
+
+def spool_worker(directory: str, database: str, count: int, results):
+    spool = SubmissionSpool(directory)
+    ratings = LocalClient(database)["portal"]["ratings"]
+    replayed = 0
+    for i in range(count):
+        spool.append("ratings", {"_id": ObjectId(), "stars": 1 + i % 5})
+        if i % 7 == 0:
+            replayed += spool.replay({"ratings": ratings}).get("ratings", 0)
+    results.put(replayed)
+
+
+def test_concurrent_appends_and_replays_lose_and_duplicate_nothing(tmp_path):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    directory, database = str(tmp_path / "spool"), str(tmp_path / "portal.db")
+    workers = [context.Process(target=spool_worker, args=(directory, database, 150, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    replayed = sum(results.get(timeout=60) for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    ratings = LocalClient(database)["portal"]["ratings"]
+    replayed += SubmissionSpool(directory).replay({"ratings": ratings}).get("ratings", 0)
+    # Every document was replayed by exactly one worker
+    assert replayed == 450
+    assert ratings.count_documents({}) == 450
@@ -0,0 +1,175 @@
+"""
+Tests for the response cache: size and TTL bounds, sharing between workers,
+and invalidation by every write path of the API.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import response_cache as response_cache_module  # noqa: E402
+import server  # noqa: E402
+from read_routing import ReadRouting  # noqa: E402
+from response_cache import ResponseCache, SharedStore  # noqa: E402
+
+
+def cached_endpoint(cache: ResponseCache):
+    calls = []
+
+    @cache.cached("ratings")
+    async def endpoint(page: int = 1):
+        calls.append(page)
+        return {"page": page}
+
+    def get(page: int = 1) -> dict:
+        return orjson.loads(asyncio.run(endpoint(page=page)).body)
+
+    return get, calls
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_size_bound():
+    cache = ResponseCache(max_entries=2, ttl=60, shared_path="", enabled=True)
+    get, calls = cached_endpoint(cache)
+    assert get(1) == {"page": 1}
+    get(2)
+    get(1)
+    get(3)
+    # 2 was the least recently used
+    get(1)
+    get(2)
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_expire_after_the_ttl_and_on_a_version_bump(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=10, ttl=5, shared_path="", enabled=True)
+    get, calls = cached_endpoint(cache)
+    get()
+    now[0] += 4.9
+    get()
+    assert calls == [1]
+    now[0] += 0.2
+    get()
+    assert calls == [1, 1]
+
+    cache.bump("ratings")
+    get()
+    assert calls == [1, 1, 1]
+    # Other collections do not affect it
+    cache.bump("quiz_scores")
+    get()
+    assert calls == [1, 1, 1]
+
+
+def test_workers_share_versions_and_entries(tmp_path):
+    path = str(tmp_path / "response_cache.db")
+    first = ResponseCache(max_entries=10, ttl=60, shared_path=path, enabled=True)
+    second = ResponseCache(max_entries=10, ttl=60, shared_path=path, enabled=True)
+    get_first, first_calls = cached_endpoint(first)
+    get_second, second_calls = cached_endpoint(second)
+
+    get_first()
+    assert get_second() == {"page": 1}
+    assert second_calls == [] and second.stats()["shared_hits"] == 1
+
+    # A write seen by one worker invalidates the other's in-process copy too
+    first.bump("ratings")
+    get_second()
+    assert second_calls == [1]
+
+
+def test_shared_store_keeps_the_newest_entries():
+    store = SharedStore(":memory:", max_entries=2)
+    for key in ("a", "b", "c"):
+        store.set(key, key.encode(), ttl=60 + ord(key))
+    assert [store.get(key) for key in ("a", "b", "c")] == [None, b"b", b"c"]
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(make_settings, cached_responses, monkeypatch):
+    monkeypatch.setattr(server, "IMAGE_PROCESSING_ENABLED", False)
+    with TestClient(server.create_app(make_settings())) as client:
+        yield client
+
+
+def fresh_read(client, cache: ResponseCache, path: str):
+    """GET `path` twice: the first read must reflect the last write, the second be a cache hit"""
+    hits = cache.stats()["hits"]
+    body = client.get(path).json()
+    assert cache.stats()["hits"] == hits, f"{path} was served from the cache after a write"
+    assert client.get(path).json() == body
+    assert cache.stats()["hits"] == hits + 1
+    return body
+
+
+SUBMITS = {
+    "ratings": lambda client: client.post("/api/ratings", json={"stars": 4, "company": "Acme"}),
+    "quiz_scores": lambda client: client.post(
+        "/api/quiz/submit", json={"score": 50, "total_questions": 10, "correct_answers": 5}
+    ),
+    "quiz_arena": lambda client: client.post(
+        "/api/quiz-arena/submit", json={"name": "Ann", "correct_answers": 5, "total_questions": 10, "average_time": 3.0}
+    ),
+}
+
+
+@pytest.mark.parametrize("collection, list_path, delete_path, bulk_path, delete_all_path", [
+    ("ratings", "/api/ratings", "/api/ratings/{}", "/api/ratings/bulk-delete", "/api/ratings"),
+    ("quiz_scores", "/api/quiz/scores", "/api/quiz/scores/{}", "/api/quiz/scores/bulk-delete", "/api/quiz/scores"),
+    ("quiz_arena", "/api/quiz-arena/all", "/api/quiz-arena/{}", "/api/quiz-arena/bulk-delete", "/api/quiz-arena"),
+])
+def test_every_write_path_invalidates_cached_reads(client, cached_responses, collection, list_path, delete_path,
+                                                   bulk_path, delete_all_path):
+    def count() -> int:
+        return len(fresh_read(client, cached_responses, list_path))
+
+    assert count() == 0
+    ids = [SUBMITS[collection](client).json()["id"] for _ in range(3)]
+    assert count() == 3
+    client.delete(delete_path.format(ids[0]))
+    assert count() == 2
+    client.post(bulk_path, json={"ids": [ids[1]]})
+    assert count() == 1
+    client.post(bulk_path, json={"timestamp_from": "2000-01-01"})
+    assert count() == 0
+    SUBMITS[collection](client)
+    assert count() == 1
+    client.delete(delete_all_path)
+    assert count() == 0
+
+
+def test_photo_uploads_invalidate_rating_reads(client, cached_responses):
+    assert fresh_read(client, cached_responses, "/api/ratings/stats")["total_ratings"] == 0
+    client.post("/api/ratings/upload", data={"stars": "5"}, files={"photo": ("p.png", png_bytes(), "image/png")})
+    assert fresh_read(client, cached_responses, "/api/ratings/stats")["total_ratings"] == 1
+
+
+def test_reads_that_may_come_from_secondaries_are_not_cached(client, cached_responses, monkeypatch):
+    monkeypatch.setattr(ReadRouting, "may_read_secondaries", True)
+    SUBMITS["ratings"](client)
+    before = cached_responses.stats()
+    for path in ("/api/ratings", "/api/ratings/stats", "/api/ratings/companies"):
+        client.get(path)
+        client.get(path)
+    after = cached_responses.stats()
+    assert after["hits"] == before["hits"] and after["entries"] == 0
+    assert after["bypassed"] - before["bypassed"] == 6
+    # Search and the leaderboard stay on the primary and are cached
+    client.get("/api/ratings/search", params={"q": "acme"})
+    assert cached_responses.stats()["entries"] == 1
@@ -0,0 +1,199 @@
+"""
+Tests for the in-process rating search index.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import mongomock
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import server  # noqa: E402
+from search_index import RatingSearchIndex, fold, stem, tokenize  # noqa: E402
+
+
+class FakeRatings:
+    name = "ratings"
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        return [dict(doc) for doc in self.docs]
+
+    def find_one(self, query, projection):
+        return next((dict(doc) for doc in self.docs if str(doc["_id"]) == str(query["_id"])), None)
+
+
+def build(docs):
+    index = RatingSearchIndex()
+    index.rebuild(FakeRatings(docs))
+    return index
+
+
+def ids(result):
+    return [doc_id for doc_id, _ in result[1]]
+
+
+def test_tokenize_folds_diacritics_and_drops_stop_words():
+    assert fold("Skvělá KÁVA") == "skvela kava"
+    assert tokenize("Káva je skvělá and the service, 10/10!") == ["kava", "skvela", "service", "10", "10"]
+    assert stem("kavu") == "kav"
+    assert stem("kava") == "kav"
+    assert stem("pes") == "pes"
+
+
+def test_matches_inflections_and_ranks_exact_forms_first():
+    index = build([
+        {"_id": "a1", "comment": "Výborná káva", "company": "Acme"},
+        {"_id": "a2", "comment": "Kávovar nefungoval", "company": "Beta"},
+        {"_id": "a3", "comment": "Pomalá obsluha", "company": "Gamma"},
+    ])
+    assert ids(index.search("kava")) == ["a1", "a2"]
+    assert ids(index.search("KÁVU")) == ["a1", "a2"]
+    assert ids(index.search("obsluha")) == ["a3"]
+    # All terms must match
+    assert ids(index.search("kava acme")) == ["a1"]
+    assert index.search("kava gamma") == (0, [])
+    assert index.search("a je") == (0, [])
+
+
+def test_company_matches_outweigh_comment_matches():
+    index = build([
+        {"_id": "c1", "comment": "Coffee from Inovix was fine", "company": "Other"},
+        {"_id": "c2", "comment": "Fine coffee", "company": "Inovix"},
+    ])
+    assert ids(index.search("inovix")) == ["c2", "c1"]
+
+
+def test_pagination_returns_total_and_slice():
+    index = build([{"_id": f"p{i}", "comment": "great booth", "company": ""} for i in range(5)])
+    total, page = index.search("booth", skip=2, limit=2)
+    assert total == 5
+    assert len(page) == 2
+    # Equal scores fall back to newest ID first
+    assert [doc_id for doc_id, _ in page] == ["p2", "p1"]
+
+
+def ratings_collection(*comments):
+    collection = mongomock.MongoClient().db.ratings
+    collection.insert_many([{"comment": comment, "company": ""} for comment in comments])
+    return collection
+
+
+def wait_for_refresh(index):
+    deadline = time.monotonic() + 5
+    while index.stats()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not index.stats()["refreshing"]
+
+
+def test_incremental_updates_and_change_events():
+    collection = ratings_collection("nice demo")
+    d1 = str(collection.find_one()["_id"])
+    index = RatingSearchIndex()
+    index.rebuild(collection)
+
+    d2 = str(ObjectId())
+    index.add({"_id": d2, "comment": "boring demo", "company": ""})
+    assert index.search("demo")[0] == 2
+    index.remove(d2)
+    assert ids(index.search("demo")) == [d1]
+
+    d3 = str(collection.insert_one({"comment": "demo from another worker", "company": ""}).inserted_id)
+    index.handle_change({"collection": "ratings", "operation": "insert", "document_id": d3})
+    assert index.search("demo")[0] == 2
+    collection.delete_one({"_id": ObjectId(d1)})
+    index.handle_change({"collection": "ratings", "operation": "delete", "document_id": d1})
+    assert ids(index.search("demo")) == [d3]
+    assert index.stats()["rebuilds"] == 1
+
+
+def test_events_without_an_id_catch_up_on_newer_documents():
+    collection = ratings_collection("nice demo", "demo two")
+    index = RatingSearchIndex()
+    index.rebuild(collection)
+
+    # Inserts the watcher only saw as an invalidation: fetched by _id, no rescan
+    collection.insert_many([{"comment": "late demo", "company": ""}, {"comment": "other", "company": ""}])
+    index.handle_change({"collection": "ratings", "operation": "invalidate", "document_id": None})
+    wait_for_refresh(index)
+    assert index.search("demo")[0] == 3
+    assert index.stats()["rebuilds"] == 1
+    assert index.stats()["catch_ups"] == 1
+
+    # Deletes cannot be caught up on: rebuild
+    collection.delete_many({"comment": "nice demo"})
+    index.handle_change({"collection": "ratings", "operation": "invalidate", "document_id": None})
+    wait_for_refresh(index)
+    assert index.search("demo")[0] == 2
+    assert index.stats()["rebuilds"] == 2
+
+
+def test_stale_index_keeps_serving_while_it_refreshes():
+    collection = ratings_collection("nice demo")
+    index = RatingSearchIndex()
+    index.rebuild(collection)
+    collection.delete_many({})
+    collection.insert_one({"comment": "fresh demo", "company": ""})
+
+    released = threading.Event()
+    find = collection.find
+    collection.find = lambda *args, **kwargs: released.wait(5) and find(*args, **kwargs)
+    index.mark_stale()
+    # The old index answers while the rescan is blocked
+    assert index.search("nice")[0] == 1
+    assert index.stats()["refreshing"]
+    released.set()
+    wait_for_refresh(index)
+    assert index.search("nice")[0] == 0
+    assert index.search("fresh")[0] == 1
+
+
+def test_updates_made_during_a_rebuild_are_kept():
+    collection = ratings_collection("nice demo")
+    added = str(ObjectId())
+    index = RatingSearchIndex()
+    find = collection.find
+
+    def find_then_write(*args, **kwargs):
+        # This worker's own submission lands while the scan is running
+        index.add({"_id": added, "comment": "demo in flight", "company": ""})
+        return find(*args, **kwargs)
+
+    collection.find = find_then_write
+    index.rebuild(collection)
+    assert ids(index.search("flight")) == [added]
+    assert index.search("demo")[0] == 2
+
+
+def test_cached_searches_follow_bulk_deletes_and_background_refreshes(make_settings, cached_responses):
+    app = server.create_app(make_settings())
+    with TestClient(app) as client:
+        ratings = app.state.db.ratings
+        ratings.insert_many([
+            {"stars": 4, "comment": "great demo", "company": "Acme" if i % 2 else "Beta", "photo": ""} for i in range(30)
+        ])
+
+        def search():
+            body = client.get("/api/ratings/search", params={"q": "demo", "page_size": 20}).json()
+            return body["total"], len(body["results"])
+
+        assert search() == (30, 20)
+        assert client.post("/api/ratings/bulk-delete", json={"company": "Acme"}).json()["deleted_count"] == 15
+        assert search() == (15, 15)
+        wait_for_refresh(app.state.search_index)
+        assert app.state.search_index.stats()["rebuilds"] == 1
+
+        # A write the index only learns about by invalidation: the cached answer
+        # is dropped once the background refresh has caught up
+        ratings.insert_one({"stars": 5, "comment": "late demo", "company": "Acme", "photo": ""})
+        assert search() == (15, 15)
+        app.state.search_index.mark_stale()
+        wait_for_refresh(app.state.search_index)
+        assert search() == (16, 16)